@@ -0,0 +1,76 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from foodgram.middleware import (
+    SAFE_METHODS,
+    close_broken_connections,
+    mark_connections_used,
+)
+
+# Маршруты роутера, которые в режиме ASGI обслуживаются асинхронно
+ASYNC_ROUTES = (
+    'recipes-list', 'recipes-detail',
+    'ingredients-list', 'ingredients-detail',
+    'tags-list', 'tags-detail',
+)
+
+
+def in_thread(view):
+    """Синхронное представление для запуска в потоке из пула.
+
+    Соединения с базой у каждого потока свои, а сигналы начала
+    и конца запроса обрабатываются в другом потоке, поэтому
+    устаревшие соединения закрываются здесь же. Ответ отрисовывается
+    в том же потоке, чтобы JSON не собирался в общем потоке Django.
+    """
+    def run(request, *args, **kwargs):
+        close_old_connections()
+        if settings.DB_HEALTH_CHECKS:
+            close_broken_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+            mark_connections_used()
+    return run
+
+
+def offload(view):
+    """Асинхронная обёртка над представлением DRF.
+
+    Django 3.2 выполняет синхронные представления под ASGI в одном
+    общем потоке, и медленный запрос задерживает все остальные.
+    Здесь чтение уходит в пул потоков и выполняется параллельно,
+    а запись по-прежнему идёт через общий поток, как у Django.
+    В Django 3.2 нет асинхронного ORM, поэтому сами запросы
+    к базе остаются синхронными.
+    """
+    read = sync_to_async(in_thread(view), thread_sensitive=False)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+    return async_view
+
+
+def async_routes(patterns):
+    """Маршруты роутера с асинхронными обёртками для ASYNC_ROUTES."""
+    if not settings.ASYNC_VIEWS:
+        return patterns
+    return [
+        URLPattern(
+            pattern.pattern, offload(pattern.callback),
+            pattern.default_args, pattern.name)
+        if pattern.name in ASYNC_ROUTES else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,66 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+# Поля пользователя, которые нужны сериализаторам и проверкам прав,
+# в порядке полей модели, как того требует from_db; остальные
+# (пароль, счётчики) догружаются из базы при обращении
+CACHED_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'role', 'is_active', 'is_staff', 'is_superuser',
+    }
+)
+
+
+def token_cache_key(key):
+    """В ключе кэша хранится хэш токена, а не сам токен."""
+    return f'auth:token:{sha256(key.encode()).hexdigest()}'
+
+
+def forget_tokens(keys):
+    """Удаление токенов из кэша после фиксации транзакции, чтобы
+    параллельный запрос не успел закэшировать старые данные."""
+    cache_keys = [token_cache_key(key) for key in keys]
+    if cache_keys:
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кэшем «токен -> пользователь».
+
+    Первый запрос с токеном проверяется в базе как обычно,
+    следующие берут пользователя из кэша без запроса к базе.
+    Записи удаляются сигналами при удалении токена (в том числе
+    при выходе) и при сохранении пользователя: смене пароля,
+    блокировке, изменении профиля. Удаление видно только процессам
+    с тем же кэшем: при locmem и нескольких процессах остальные
+    узнают о нём через AUTH_TOKEN_CACHE_TIMEOUT секунд.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.AUTH_TOKEN_CACHE_TIMEOUT:
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        values = cache.get(cache_key)
+        if values is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(
+                cache_key,
+                [getattr(user, field) for field in CACHED_FIELDS],
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            )
+            return user, token
+        user = User.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, values)
+        token = Token.from_db(DEFAULT_DB_ALIAS, ('key', 'user_id'),
+                              (key, user.pk))
+        token.user = user
+        return user, token
@@ -0,0 +1,50 @@
+import time
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = 'recipes:catalog_version'
+RECIPE_LIST_PARAMS = (
+    'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+    'ingredients', 'exclude_ingredients', 'pantry', 'max_missing',
+    'ordering', 'page', 'limit', 'cursor', 'format',
+)
+
+
+def get_catalog_version():
+    """Текущая версия каталога рецептов.
+
+    Если ключа нет (кэш очищен или вытеснен), версия начинается
+    с текущего времени в миллисекундах, чтобы не совпасть ни с одной
+    из прежних и не поднять устаревшие записи.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+
+
+def bump_catalog_version_on_commit():
+    """Сдвиг версии после фиксации транзакции, чтобы в кэш не попали
+    данные, которые ещё не видны другим соединениям."""
+    transaction.on_commit(bump_catalog_version)
+
+
+def recipe_list_cache_key(request):
+    """Ключ кэша для нормализованных параметров списка рецептов."""
+    params = sorted(
+        (name, tuple(sorted(request.query_params.getlist(name))))
+        for name in RECIPE_LIST_PARAMS
+        if name in request.query_params
+    )
+    digest = md5(repr((request.get_host(), params)).encode()).hexdigest()
+    return f'recipes:list:{get_catalog_version()}:{digest}'
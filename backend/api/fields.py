@@ -1,13 +1,123 @@
-import base64
+import binascii
+import re
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files import File
+from django.templatetags.static import static
+from PIL import Image
 from rest_framework import serializers
+from rest_framework.serializers import ListSerializer
+
+from recipes.models import Recipe
+
+DECODE_CHUNK_SIZE = 64 * 1024
+# Символы вне алфавита base64 (переводы строк, пробелы) b64decode
+# пропускает, поэтому они убираются до нарезки на группы по 4
+NOT_BASE64 = re.compile(r'[^A-Za-z0-9+/=]')
+SPOOL_MAX_SIZE = 1024 * 1024
+PLACEHOLDER = 'recipes/placeholder.png'
+# Маркер вместо файла, пока изображение обрабатывается
+PROCESSING = object()
+IMAGE_ERRORS = (OSError, SyntaxError, ValueError, Image.DecompressionBombError)
 
 
 class Base64ImageField(serializers.ImageField):
+    """Изображение в виде data URI.
+
+    Строка декодируется кусками во временный файл, который до
+    SPOOL_MAX_SIZE живёт в памяти, а дальше на диске. Слишком большие
+    по размеру или разрешению изображения отклоняются до полного
+    декодирования.
+    """
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size} МБ.',
+        'too_big': 'Сторона изображения не должна превышать {max_side} px.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            return self.decode(data)
         return super().to_internal_value(data)
+
+    def check_dimensions(self, image):
+        if max(image.size) > settings.IMAGE_MAX_SIDE:
+            self.fail('too_big', max_side=settings.IMAGE_MAX_SIDE)
+
+    def decode(self, data):
+        header, separator, _ = data[:100].partition(';base64,')
+        if not separator:
+            self.fail('invalid_image')
+        start = len(header) + len(separator)
+        if (len(data) - start) * 3 // 4 > settings.IMAGE_MAX_SIZE:
+            self.fail('too_large',
+                      max_size=settings.IMAGE_MAX_SIZE // (1024 * 1024))
+        file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        rest = ''
+        try:
+            for position in range(start, len(data), DECODE_CHUNK_SIZE):
+                chunk = rest + NOT_BASE64.sub(
+                    '', data[position:position + DECODE_CHUNK_SIZE])
+                # Неполная группа из 4 символов ждёт следующего куска
+                end = len(chunk) - len(chunk) % 4
+                file.write(b64decode(chunk[:end]))
+                rest = chunk[end:]
+                if position == start:
+                    self.probe_dimensions(file)
+            if rest:
+                file.write(b64decode(rest))
+            file.seek(0)
+            image = Image.open(file)
+            self.check_dimensions(image)
+            image.verify()
+        except (binascii.Error, *IMAGE_ERRORS):
+            file.close()
+            self.fail('invalid_image')
+        except serializers.ValidationError:
+            file.close()
+            raise
+        file.seek(0)
+        return File(file, name=f'temp.{image.format.lower()}')
+
+    def probe_dimensions(self, file):
+        """Проверка разрешения по первому куску, где лежит заголовок."""
+        file.seek(0)
+        try:
+            self.check_dimensions(Image.open(file))
+        except IMAGE_ERRORS:
+            pass
+        file.seek(0, 2)
+
+
+class RenditionImageField(serializers.ImageField):
+    """Отдаёт уменьшенную копию изображения, если она уже создана.
+
+    С list_only=True копия используется только при выводе списка,
+    а отдельный объект получает оригинал. Пока изображение
+    обрабатывается, вместо него отдаётся заглушка.
+    """
+
+    def __init__(self, rendition, list_only=False, **kwargs):
+        self.rendition = rendition
+        self.list_only = list_only
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if instance.image_status != Recipe.IMAGE_READY:
+            return PROCESSING
+        in_list = isinstance(self.parent.parent, ListSerializer)
+        if in_list or not self.list_only:
+            rendition = getattr(instance, self.rendition)
+            if rendition:
+                return rendition
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        if value is not PROCESSING:
+            return super().to_representation(value)
+        request = self.context.get('request')
+        if request is None:
+            return static(PLACEHOLDER)
+        return request.build_absolute_uri(static(PLACEHOLDER))
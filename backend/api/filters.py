@@ -1,9 +1,37 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.search import search_recipes
+from .pantry_index import pantry_index
+from .user_sets import get_user_sets
 
 User = get_user_model()
 
+# Больше стольких идентификаторов в IN не передаём: списки избранного
+# и корзины заменяются JOIN-ом, а id из индекса ингредиентов -
+# подзапросами, которые фильтруют в базе
+MAX_IN_IDS = 500
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+class RecipeOrderingFilter(filters.OrderingFilter):
+    """trending всегда сортирует по убыванию оценки популярности."""
+
+    def get_ordering_value(self, param):
+        if param.lstrip('-') == 'trending':
+            return '-trending_score'
+        return super().get_ordering_value(param)
+
+
+def ingredients_of_recipe(**lookup):
+    return IngredientInRecipe.objects.filter(
+        recipe=OuterRef('pk'), **lookup)
+
 
 class IngredientFilter(FilterSet):
     name = filters.CharFilter(field_name='name', lookup_expr='startswith')
@@ -23,19 +51,84 @@ class RecipeFilter(FilterSet):
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    exclude_ingredients = NumberInFilter(method='filter_exclude_ingredients')
+    pantry = NumberInFilter(method='filter_pantry')
+    max_missing = filters.NumberFilter(min_value=0, method='skip_filter')
+    ordering = RecipeOrderingFilter(
+        fields=(
+            ('pub_date', 'pub_date'),
+            ('favorites_count', 'favorites'),
+            ('in_carts_count', 'carts'),
+            ('trending_score', 'trending'),
+        )
+    )
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author',)
 
-    def filter_is_favorited(self, queryset, name, value):
+    def filter_by_user_set(self, queryset, name, lookup):
         user = self.request.user
-        if value and not user.is_anonymous:
-            return queryset.filter(favorites__user=user)
+        if user.is_anonymous:
+            return queryset
+        ids = get_user_sets(self.request).ids(name)
+        if len(ids) > MAX_IN_IDS:
+            return queryset.filter(**{lookup: user})
+        return queryset.filter(id__in=list(ids))
+
+    def filter_is_favorited(self, queryset, name, value):
+        if value:
+            return self.filter_by_user_set(
+                queryset, 'favorites', 'favorites__user')
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if value and not user.is_anonymous:
-            return queryset.filter(shopping_cart__user=user)
+        if value:
+            return self.filter_by_user_set(
+                queryset, 'shopping_cart', 'shopping_cart__user')
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        """Рецепты со всеми перечисленными ингредиентами."""
+        value = {int(pk) for pk in value}
+        ids = pantry_index.containing_all(value)
+        if len(ids) <= MAX_IN_IDS:
+            return queryset.filter(id__in=list(ids))
+        for pk in value:
+            queryset = queryset.filter(
+                Exists(ingredients_of_recipe(ingredient_id=pk)))
+        return queryset
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        """Рецепты без единого из перечисленных ингредиентов."""
+        value = {int(pk) for pk in value}
+        ids = pantry_index.containing_any(value)
+        if len(ids) <= MAX_IN_IDS:
+            return queryset.exclude(id__in=list(ids))
+        return queryset.exclude(
+            Exists(ingredients_of_recipe(ingredient_id__in=value)))
+
+    def filter_pantry(self, queryset, name, value):
+        """Рецепты, которые можно приготовить из ингредиентов pantry,
+        докупив не больше max_missing (по умолчанию 0) позиций."""
+        value = {int(pk) for pk in value}
+        max_missing = int(self.form.cleaned_data.get('max_missing') or 0)
+        ids = pantry_index.missing_at_most(value, max_missing)
+        if len(ids) <= MAX_IN_IDS:
+            return queryset.filter(id__in=list(ids))
+        missing = ingredients_of_recipe().exclude(
+            ingredient_id__in=value
+        ).order_by().values('recipe').annotate(
+            total=Count('pk')
+        ).values('total')
+        return queryset.annotate(
+            missing=Coalesce(Subquery(missing), 0)
+        ).filter(missing__lte=max_missing)
+
+    def skip_filter(self, queryset, name, value):
         return queryset
@@ -0,0 +1,90 @@
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import Count
+
+from recipes.models import Ingredient
+
+IngredientSnapshot = namedtuple(
+    'IngredientSnapshot', ('keys', 'items', 'built_at'))
+
+
+class IngredientIndex:
+    """Индекс ингредиентов для автодополнения в памяти процесса.
+
+    Названия в нижнем регистре хранятся в отсортированном списке:
+    совпадения по началу ищутся бинарным поиском, затем добавляются
+    совпадения по подстроке. Внутри каждой группы выше идут
+    ингредиенты, которые чаще используются в рецептах.
+    Индекс строится при первом обращении и перестраивается после
+    сброса или по истечении INGREDIENT_INDEX_TTL секунд.
+    Ключи, записи и время сборки лежат в одном кортеже
+    IngredientSnapshot, который подменяется целиком под блокировкой:
+    читатели в других потоках работают со своей ссылкой на него
+    и не видят полусобранный или сброшенный индекс.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+
+    def invalidate(self):
+        self._index = None
+
+    @staticmethod
+    def _is_stale(index):
+        return (index is None
+                or time.monotonic() - index.built_at
+                > settings.INGREDIENT_INDEX_TTL)
+
+    def _build(self):
+        ingredients = Ingredient.objects.annotate(
+            popularity=Count('IngredientInRecipe')
+        ).values_list('id', 'name', 'measurement_unit', 'popularity')
+        rows = sorted(
+            (name.lower(), -popularity, name, pk, unit)
+            for pk, name, unit, popularity in ingredients
+        )
+        items = tuple(
+            (popularity, name, {
+                'id': pk, 'name': name, 'measurement_unit': unit
+            })
+            for _, popularity, name, pk, unit in rows
+        )
+        keys = tuple(row[0] for row in rows)
+        return IngredientSnapshot(keys, items, time.monotonic())
+
+    def _snapshot(self):
+        index = self._index
+        if self._is_stale(index):
+            with self._lock:
+                index = self._index
+                if self._is_stale(index):
+                    index = self._index = self._build()
+        return index
+
+    def search(self, query):
+        """Ингредиенты, название которых начинается с query или
+        содержит query, без учёта регистра."""
+        index = self._snapshot()
+        keys, items = index.keys, index.items
+        query = query.lower()
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        prefix = items[start:end]
+        substring = [
+            item for key, item in zip(keys, items)
+            if query in key and not key.startswith(query)
+        ]
+        return [
+            item[2] for group in (prefix, substring)
+            for item in sorted(group, key=lambda item: item[:2])
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,82 @@
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+TIMEOUT = 30
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/{recipe_id}/',
+    '/api/ingredients/?name=%D1%81',
+    '/api/tags/',
+)
+
+
+def measure(url):
+    """Время ответа в секундах и признак успешного ответа."""
+    start = time.perf_counter()
+    try:
+        with urlopen(url, timeout=TIMEOUT) as response:
+            response.read()
+            ok = response.status < 400
+    except OSError:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values, share):
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочная проверка чтения: запросы в секунду и задержки '
+            'для одного или нескольких запущенных серверов, например '
+            'WSGI и ASGI')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'servers', nargs='+',
+            help='Адреса серверов, например http://127.0.0.1:8000'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Число запросов к каждому серверу'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=20,
+            help='Число одновременных клиентов'
+        )
+
+    def recipe_id(self, server):
+        with urlopen(f'{server}/api/recipes/?limit=1',
+                     timeout=TIMEOUT) as response:
+            results = json.load(response)['results']
+        if not results:
+            raise CommandError(f'{server}: в базе нет рецептов')
+        return results[0]['id']
+
+    def run(self, server, options):
+        paths = [path.format(recipe_id=self.recipe_id(server))
+                 for path in PATHS]
+        urls = islice(cycle(f'{server}{path}' for path in paths),
+                      options['requests'])
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(measure, urls))
+        elapsed = time.perf_counter() - start
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(not ok for _, ok in results)
+        self.stdout.write(
+            f'{server}: {len(results) / elapsed:.1f} запросов/с, '
+            f'p50 {percentile(latencies, 0.5) * 1000:.1f} мс, '
+            f'p99 {percentile(latencies, 0.99) * 1000:.1f} мс, '
+            f'ошибок {errors}'
+        )
+
+    def handle(self, *args, **options):
+        for server in options['servers']:
+            self.run(server.rstrip('/'), options)
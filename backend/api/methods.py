@@ -1,36 +1,146 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
 
+from recipes.counters import set_counter
 from recipes.models import Recipe
-from users.models import User
+from .user_sets import relation_name, update_user_sets
+
+
+def add_recipes(model, user, recipe_ids):
+    """Добавление рецептов в избранное или корзину пачкой.
+
+    Уже добавленные и несуществующие рецепты отсекаются одним запросом,
+    остальные вставляются через bulk_create без конфликтов.
+    bulk_create не отправляет сигналов, а параллельный запрос может
+    успеть вставить те же строки, поэтому счётчики не сдвигаются на
+    число найденных id, а пересчитываются по фактическим строкам.
+    Возвращает список добавленных id.
+    """
+    related_name = model._meta.get_field('recipe').remote_field.related_name
+    with transaction.atomic():
+        added = list(
+            Recipe.objects.filter(id__in=recipe_ids).exclude(
+                **{f'{related_name}__user': user}
+            ).values_list('id', flat=True)
+        )
+        if added:
+            model.objects.bulk_create(
+                [model(user=user, recipe_id=recipe_id)
+                 for recipe_id in added],
+                ignore_conflicts=True
+            )
+            set_counter(model, added)
+    return added
+
+
+def remove_recipes(model, user, recipe_ids):
+    """Удаление рецептов из избранного или корзины одним DELETE ... IN.
+
+    Строки блокируются до удаления: параллельный запрос дождётся
+    фиксации и уже не найдёт их, так что сигналы удаления уменьшат
+    счётчики один раз.
+    Возвращает список удалённых id.
+    """
+    with transaction.atomic():
+        removed = list(model.objects.select_for_update().filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        if removed:
+            model.objects.filter(
+                user=user, recipe_id__in=removed
+            ).delete()
+    return removed
 
 
 def post_or_delete_method(cart_or_favortie_model,
                           cart_or_favortie_serializer,
                           request,
                           **kwargs):
-    recipe = get_object_or_404(Recipe, id=kwargs['pk'])
-    user = get_object_or_404(User, id=request.user.id)
-    recipe_is_in_shopping_cart_or_favorite = (
-        cart_or_favortie_model.objects.filter(
-            user=user.id,
-            recipe=recipe
-        ))
-
-    if request.method == 'POST':
-        if not recipe_is_in_shopping_cart_or_favorite.exists():
-            serializer = cart_or_favortie_serializer(
-                data={'user': user.id, 'recipe': recipe.id}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response({'error': 'Рецепт уже добавлен'},
-                        status=status.HTTP_400_BAD_REQUEST)
-
-    if recipe_is_in_shopping_cart_or_favorite.exists():
-        recipe_is_in_shopping_cart_or_favorite.delete()
+    """Идемпотентное добавление или удаление одного рецепта.
+
+    Повторный POST не ошибка: вставка упирается в ограничение
+    уникальности, и рецепт просто остаётся на месте (200 вместо 201).
+    DELETE отсутствующего рецепта тоже отвечает 204.
+    """
+    user = request.user
+    if request.method == 'DELETE':
+        deleted = remove_recipes(
+            cart_or_favortie_model, user, [kwargs['pk']])
+        if deleted:
+            update_user_sets(request, relation_name(cart_or_favortie_model),
+                             deleted, added=False)
         return Response(status=status.HTTP_204_NO_CONTENT)
-    return Response({'error': 'Рецепт не в избранном'},
-                    status=status.HTTP_400_BAD_REQUEST)
+
+    recipe = get_object_or_404(Recipe, id=kwargs['pk'])
+    instance = cart_or_favortie_model(user=user, recipe=recipe)
+    created = True
+    try:
+        with transaction.atomic():
+            instance.save(force_insert=True)
+    except IntegrityError:
+        created = False
+    update_user_sets(request, relation_name(cart_or_favortie_model),
+                     (recipe.id,), added=True)
+    serializer = cart_or_favortie_serializer(
+        instance, context={'request': request})
+    return Response(
+        serializer.data,
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+    )
+
+
+def post_or_delete_many(cart_or_favortie_model,
+                        recipe_ids_serializer,
+                        request):
+    """Пакетное добавление (POST) или удаление (DELETE) рецептов."""
+    serializer = recipe_ids_serializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    recipe_ids = serializer.validated_data['recipes']
+    added = request.method == 'POST'
+    change = add_recipes if added else remove_recipes
+    changed = change(cart_or_favortie_model, request.user, recipe_ids)
+    if changed:
+        update_user_sets(request, relation_name(cart_or_favortie_model),
+                         changed, added=added)
+    return Response({'added' if added else 'removed': sorted(changed)})
+
+
+def get_recipes_limit(request):
+    """Значение recipes_limit из запроса, ограниченное сверху."""
+    try:
+        limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return settings.RECIPES_LIMIT_MAX
+    if limit < 0:
+        return settings.RECIPES_LIMIT_MAX
+    return min(limit, settings.RECIPES_LIMIT_MAX)
+
+
+def limited_recipes(authors, limit):
+    """Не более limit последних рецептов каждого автора одним запросом.
+
+    Рецепты нумеруются оконной функцией ROW_NUMBER в разрезе автора,
+    отбор по номеру делается во внешнем запросе.
+    """
+    if not authors:
+        # Для пустого списка Django не строит SQL подзапроса
+        return Recipe.objects.none()
+    ranked = Recipe.objects.filter(author__in=authors).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author'),
+            order_by=(F('pub_date').desc(), F('id').desc()),
+        )
+    ).values('id', 'row_number').order_by()
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked '
+        f'WHERE ranked.row_number <= %s',
+        (*params, limit)
+    ))
@@ -0,0 +1,77 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """Заголовки ETag и Last-Modified для list и retrieve.
+
+    Валидаторы считаются по уже загруженным объектам до сериализации:
+    если клиент прислал совпадающий If-None-Match или
+    If-Modified-Since, сразу отдаётся 304.
+    """
+
+    def get_object_etag(self, obj):
+        """Значения, изменение которых меняет представление объекта."""
+        return [field.value_from_object(obj)
+                for field in obj._meta.concrete_fields]
+
+    def get_last_modified(self, objects):
+        return None
+
+    def get_etag(self, request, parts):
+        digest = hashlib.md5(
+            repr((request.get_full_path(), request.user.pk, parts)).encode()
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def conditional_response(self, request, parts, last_modified=None):
+        """Возвращает (ответ 304 или None, etag, last_modified)."""
+        etag = self.get_etag(request, parts)
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+        return response, etag, last_modified
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = list(queryset) if page is None else page
+        parts = [self.get_object_etag(obj) for obj in objects]
+        if page is not None:
+            parts.append(self.paginator.get_next_link())
+            if hasattr(self.paginator, 'page'):
+                parts.append(self.paginator.page.paginator.count)
+        not_modified, etag, last_modified = self.conditional_response(
+            request, parts, self.get_last_modified(objects))
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(objects, many=True)
+        if page is None:
+            response = Response(serializer.data)
+        else:
+            response = self.get_paginated_response(serializer.data)
+        return self.set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        not_modified, etag, last_modified = self.conditional_response(
+            request, self.get_object_etag(instance),
+            self.get_last_modified([instance]))
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return self.set_validators(
+            Response(serializer.data), etag, last_modified)
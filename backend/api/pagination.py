@@ -1,5 +1,106 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
+    """Постраничная пагинация с необязательным режимом курсора.
+
+    Если у представления задан cursor_ordering, например
+    ('pub_date', 'id'), то запрос с параметром ?cursor= (для первой
+    страницы пустым) листается по ключу: без COUNT(*) и OFFSET,
+    по убыванию указанных полей. Первое поле - дата и время,
+    второе - целочисленный ключ. Курсор не сочетается с другой
+    сортировкой и с поиском, который сортирует по релевантности:
+    такой запрос получает ответ 400.
+    """
     page_size_query_param = "limit"
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    search_query_param = 'search'
+    invalid_cursor_message = 'Неверный курсор'
+    cursor_conflict_message = 'Не сочетается с параметром cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_fields = getattr(view, 'cursor_ordering', None)
+        if (self.cursor_fields
+                and self.cursor_query_param in request.query_params):
+            return self.paginate_keyset(queryset, request)
+        self.cursor_fields = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def check_cursor_params(self, request):
+        first, _ = self.cursor_fields
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering and ordering != f'-{first}':
+            raise ValidationError(
+                {self.ordering_query_param: self.cursor_conflict_message})
+        if request.query_params.get(self.search_query_param):
+            raise ValidationError(
+                {self.search_query_param: self.cursor_conflict_message})
+
+    def paginate_keyset(self, queryset, request):
+        self.request = request
+        self.check_cursor_params(request)
+        first, second = self.cursor_fields
+        page_size = self.get_page_size(request) or 1
+        queryset = queryset.order_by(f'-{first}', f'-{second}')
+        position = self.decode_cursor(request)
+        if position is not None:
+            value, key = position
+            queryset = queryset.filter(
+                Q(**{f'{first}__lt': value})
+                | Q(**{first: value, f'{second}__lt': key})
+            )
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            last = page[-1]
+            self.next_position = (getattr(last, first),
+                                  getattr(last, second))
+        return page
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, key = urlsafe_b64decode(
+                encoded.encode()).decode().rsplit(',', 1)
+            value, key = parse_datetime(value), int(key)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, key
+
+    def encode_cursor(self, position):
+        value, key = position
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return urlsafe_b64encode(f'{value},{key}'.encode()).decode()
+
+    def get_next_link(self):
+        if not self.cursor_fields:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.cursor_fields:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
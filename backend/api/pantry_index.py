@@ -0,0 +1,184 @@
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
+from threading import Lock
+
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import IngredientInRecipe, Recipe
+from .cache import get_catalog_version
+
+# Запас по времени при догрузке изменений: рецепт мог получить
+# updated_at раньше, а зафиксироваться позже предыдущей синхронизации
+SYNC_OVERLAP = timedelta(minutes=1)
+
+PantrySnapshot = namedtuple('PantrySnapshot', (
+    'postings', 'by_size', 'recipes', 'version', 'built_at', 'synced_at'))
+
+
+def with_id(ids, pk):
+    position = bisect_left(ids, pk)
+    if position < len(ids) and ids[position] == pk:
+        return ids
+    return ids[:position] + array('q', (pk,)) + ids[position:]
+
+
+def without_id(ids, pk):
+    position = bisect_left(ids, pk)
+    if position < len(ids) and ids[position] == pk:
+        return ids[:position] + ids[position + 1:]
+    return ids
+
+
+def replace_recipe(postings, by_size, recipes, recipe_id, ingredients):
+    """Замена ингредиентов рецепта в копиях словарей индекса."""
+    old = set(recipes.get(recipe_id, ()))
+    for ingredient_id in old - ingredients:
+        postings[ingredient_id] = without_id(
+            postings[ingredient_id], recipe_id)
+    for ingredient_id in ingredients - old:
+        postings[ingredient_id] = with_id(
+            postings.get(ingredient_id, array('q')), recipe_id)
+    if old:
+        by_size[len(old)] = by_size[len(old)] - {recipe_id}
+    if ingredients:
+        by_size[len(ingredients)] = (
+            by_size.get(len(ingredients), frozenset()) | {recipe_id})
+        recipes[recipe_id] = tuple(ingredients)
+    else:
+        recipes.pop(recipe_id, None)
+
+
+class PantryIndex:
+    """Обратный индекс «ингредиент -> рецепты» в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для каждого рецепта - кортеж его ингредиентов.
+    Когда версия каталога меняется, индекс догружает только рецепты
+    с новым updated_at; полностью он перестраивается раз
+    в PANTRY_INDEX_TTL секунд, чтобы забыть удалённые рецепты.
+    Версия из locmem не видна другим процессам, поэтому догрузка
+    выполняется и просто раз в PANTRY_INDEX_SYNC_INTERVAL секунд.
+    Все части индекса лежат в одном кортеже PantrySnapshot. Догрузка
+    правит копии словарей и подменяет кортеж целиком под блокировкой,
+    поэтому читатели в других потоках без блокировки видят
+    согласованный индекс, который не меняется у них в руках.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._index = None
+
+    def invalidate(self):
+        self._index = None
+
+    @staticmethod
+    def _is_stale(index):
+        return (index is None
+                or time.monotonic() - index.built_at
+                > settings.PANTRY_INDEX_TTL)
+
+    @staticmethod
+    def _is_behind(index, version):
+        return (index.version != version
+                or timezone.now() - index.synced_at > timedelta(
+                    seconds=settings.PANTRY_INDEX_SYNC_INTERVAL))
+
+    def _build(self, version):
+        synced_at = timezone.now()
+        recipes = defaultdict(set)
+        rows = IngredientInRecipe.objects.order_by().values_list(
+            'recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows.iterator():
+            recipes[recipe_id].add(ingredient_id)
+        postings = defaultdict(list)
+        by_size = defaultdict(set)
+        for recipe_id in sorted(recipes):
+            for ingredient_id in recipes[recipe_id]:
+                postings[ingredient_id].append(recipe_id)
+            by_size[len(recipes[recipe_id])].add(recipe_id)
+        return PantrySnapshot(
+            postings={
+                ingredient_id: array('q', ids)
+                for ingredient_id, ids in postings.items()
+            },
+            by_size={
+                size: frozenset(ids) for size, ids in by_size.items()
+            },
+            recipes={
+                recipe_id: tuple(ingredients)
+                for recipe_id, ingredients in recipes.items()
+            },
+            version=version,
+            built_at=time.monotonic(),
+            synced_at=synced_at,
+        )
+
+    def _sync(self, index, version):
+        synced_at = timezone.now()
+        changed = list(Recipe.objects.filter(
+            updated_at__gte=index.synced_at - SYNC_OVERLAP
+        ).values_list('id', flat=True))
+        recipes = defaultdict(set)
+        rows = IngredientInRecipe.objects.filter(
+            recipe_id__in=changed).values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in rows:
+            recipes[recipe_id].add(ingredient_id)
+        postings = dict(index.postings)
+        by_size = dict(index.by_size)
+        recipe_ingredients = dict(index.recipes)
+        for recipe_id in changed:
+            replace_recipe(postings, by_size, recipe_ingredients,
+                           recipe_id, recipes[recipe_id])
+        return index._replace(
+            postings=postings, by_size=by_size, recipes=recipe_ingredients,
+            version=version, synced_at=synced_at)
+
+    def _snapshot(self):
+        version = get_catalog_version()
+        index = self._index
+        if self._is_stale(index) or self._is_behind(index, version):
+            with self._lock:
+                index = self._index
+                if self._is_stale(index):
+                    index = self._index = self._build(version)
+                elif self._is_behind(index, version):
+                    index = self._index = self._sync(index, version)
+        return index
+
+    def containing_all(self, ingredient_ids):
+        """Рецепты, в которых есть все перечисленные ингредиенты."""
+        postings = self._snapshot().postings
+        lists = sorted(
+            (postings.get(pk, ()) for pk in set(ingredient_ids)), key=len)
+        if not lists:
+            return set()
+        return set(lists[0]).intersection(*lists[1:])
+
+    def containing_any(self, ingredient_ids):
+        """Рецепты, в которых есть хотя бы один из ингредиентов."""
+        postings = self._snapshot().postings
+        return set().union(
+            *(postings.get(pk, ()) for pk in set(ingredient_ids)))
+
+    def missing_at_most(self, ingredient_ids, max_missing):
+        """Рецепты, для которых из ингредиентов не хватает
+        не больше max_missing."""
+        index = self._snapshot()
+        found = Counter()
+        for pk in set(ingredient_ids):
+            found.update(index.postings.get(pk, ()))
+        result = {
+            recipe_id for recipe_id, count in found.items()
+            if len(index.recipes.get(recipe_id, ())) - count <= max_missing
+        }
+        for size, ids in index.by_size.items():
+            if size <= max_missing:
+                result |= ids
+        return result
+
+
+pantry_index = PantryIndex()
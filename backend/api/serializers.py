@@ -1,7 +1,11 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+from rest_framework.validators import UniqueValidator
 
+from recipes.images import schedule_image_processing
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -10,8 +14,10 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
-from users.models import Subscription, User
-from .fields import Base64ImageField
+from users.models import User
+from .fields import Base64ImageField, RenditionImageField
+from .methods import get_recipes_limit
+from .user_sets import get_user_sets
 
 
 class UsersSerializer(UserSerializer):
@@ -29,11 +35,12 @@ class UsersSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        user = request.user
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        return get_user_sets(request).contains('subscriptions', obj.id)
 
 
 class UsersCreateSerializer(UserCreateSerializer):
@@ -75,7 +82,7 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class AddIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -111,6 +118,13 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     {'Кол-во ингредиента должно быть больше 0'}
                 )
             ingredients_list.append(ingredient_id)
+        existing = set(Ingredient.objects.filter(
+            id__in=ingredients_list).values_list('id', flat=True))
+        missing = set(ingredients_list) - existing
+        if missing:
+            raise serializers.ValidationError(
+                {f'Ингредиента с id {min(missing)} не существует'}
+            )
         return data
 
     def validate_tags(self, data):
@@ -129,31 +143,69 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     def add_ingredients(self, ingredients, recipe):
         IngredientInRecipe.objects.bulk_create([IngredientInRecipe(
-            ingredient=ingredient['id'],
+            ingredient_id=ingredient['id'],
             recipe=recipe,
             amount=ingredient['amount']
         ) for ingredient in ingredients])
 
+    def update_ingredients(self, ingredients, recipe):
+        """Применяет к ингредиентам рецепта только разницу."""
+        current = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = [
+            row.id for ingredient_id, row in current.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            row = current.get(ingredient_id)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if removed:
+            IngredientInRecipe.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        self.add_ingredients([
+            ingredient for ingredient in ingredients
+            if ingredient['id'] not in current
+        ], recipe)
+
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(author=request.user, **validated_data)
+        recipe = Recipe.objects.create(
+            author=request.user,
+            image_status=Recipe.IMAGE_PROCESSING,
+            **validated_data
+        )
         recipe.tags.set(tags)
         self.add_ingredients(ingredients, recipe)
+        schedule_image_processing(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
 
+        if 'image' in validated_data:
+            validated_data['image_status'] = Recipe.IMAGE_PROCESSING
         recipe = super().update(recipe, validated_data)
+        if 'image' in validated_data:
+            schedule_image_processing(recipe)
 
         if ingredients:
-            recipe.ingredients.clear()
-            self.add_ingredients(ingredients, recipe)
+            self.update_ingredients(ingredients, recipe)
         if tags:
-            recipe.tags.clear()
             recipe.tags.set(tags)
 
         return recipe
@@ -161,12 +213,16 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        prefetch_related_objects([instance], 'tags', Prefetch(
+            'IngredientInRecipe',
+            queryset=IngredientInRecipe.objects.select_related('ingredient')
+        ))
         return RecipeListSerializer(instance, context=context).data
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     name = serializers.ReadOnlyField()
-    image = Base64ImageField(read_only=True)
+    image = RenditionImageField(rendition='image_thumbnail')
     cooking_time = serializers.ReadOnlyField()
 
     class Meta:
@@ -182,7 +238,7 @@ class RecipeListSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    image = Base64ImageField()
+    image = RenditionImageField(rendition='image_card', list_only=True)
 
     class Meta:
         model = Recipe
@@ -194,20 +250,18 @@ class RecipeListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        user = request.user
-        return Favorite.objects.filter(user=user, recipe=obj).exists()
+        return get_user_sets(request).contains('favorites', obj.id)
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if request.user.is_anonymous:
             return False
-        user = request.user
-        return ShoppingCart.objects.filter(user=user, recipe=obj).exists()
+        return get_user_sets(request).contains('shopping_cart', obj.id)
 
 
 class SubscriptionSerializer(UsersSerializer):
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -216,29 +270,19 @@ class SubscriptionSerializer(UsersSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            request = self.context.get('request')
+            recipes = obj.recipes.all()[:get_recipes_limit(request)]
         serializer = RecipeSerializer(recipes, many=True)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ('user', 'recipe')
-        validators = (
-            UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=('user', 'recipe'),
-                message='Данный рецепт уже есть'
-            ),
-        )
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -250,16 +294,12 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
 class ShoppingCartSerializer(FavoriteRecipeSerializer):
     class Meta(FavoriteRecipeSerializer.Meta):
         model = ShoppingCart
-        validators = (
-            UniqueTogetherValidator(
-                queryset=model.objects.all(),
-                fields=('user', 'recipe'),
-                message='Данный рецепт уже есть'
-            ),
-        )
 
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        recipe = instance.recipe
-        return RecipeSerializer(recipe, context=context).data
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций"""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPES_BATCH_MAX
+    )
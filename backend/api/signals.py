@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.images import image_processed
+from recipes.trending import trending_refreshed
+from .authentication import forget_tokens
+from .cache import bump_catalog_version_on_commit
+from .ingredient_index import ingredient_index
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+@receiver(trending_refreshed)
+@receiver(image_processed)
+def invalidate_recipe_lists(**kwargs):
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipe_lists_on_author_change(update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_catalog_version_on_commit()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(instance, created, update_fields, **kwargs):
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    forget_tokens(Token.objects.filter(
+        user_id=instance.pk).values_list('key', flat=True))
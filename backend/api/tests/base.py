@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+from ..ingredient_index import ingredient_index
+from ..pantry_index import pantry_index
+
+PASSWORD = 'Pass-12345!'
+
+
+class CatalogTestCase(APITestCase):
+    """Каталог для тестов API: авторы с рецептами, теги, ингредиенты.
+
+    Данные создаются один раз на класс. Кэш и индексы в памяти
+    процесса сбрасываются перед каждым тестом, потому что транзакция
+    теста откатывается, а они об этом не знают.
+    """
+    authors_count = 3
+    recipes_per_author = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('абрикос', 'абрикосовый сок', 'мука', 'сахар',
+                         'соль', 'соль морская')
+        ]
+        cls.user = cls.create_user('reader')
+        cls.authors = [
+            cls.create_user(f'author{i}') for i in range(cls.authors_count)
+        ]
+        cls.recipes = [
+            cls.create_recipe(author, f'Рецепт {i}', i)
+            for author in cls.authors
+            for i in range(cls.recipes_per_author)
+        ]
+
+    @classmethod
+    def create_user(cls, username):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com',
+            password=PASSWORD)
+
+    @classmethod
+    def create_recipe(cls, author, name, number=0, ingredients=None):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Описание', cooking_time=10,
+            image='recipes/test.png')
+        recipe.tags.set(cls.tags[:1 + number % len(cls.tags)])
+        if ingredients is None:
+            ingredients = [
+                cls.ingredients[(number + shift) % len(cls.ingredients)]
+                for shift in range(3)
+            ]
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient,
+                               amount=10 * (position + 1))
+            for position, ingredient in enumerate(ingredients)
+        )
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+        pantry_index.invalidate()
+
+    def client_for(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    @classmethod
+    def add_relations(cls, user):
+        """Избранное, корзина и подписки, чтобы флаги были истинны."""
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=user, recipe=recipe)
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        for author in cls.authors:
+            Subscription.objects.create(user=user, author=author)
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import include, path
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..async_views import ASYNC_ROUTES, async_routes, offload
+from ..urls import router
+
+
+with override_settings(ASYNC_VIEWS=True):
+    urlpatterns = [path('api/', include(async_routes(router.urls)))]
+
+
+class ThreadView(APIView):
+    """Отвечает идентификатором потока, в котором оно выполнялось."""
+    authentication_classes = ()
+    permission_classes = ()
+
+    def get(self, request):
+        return Response({'thread': threading.get_ident()})
+
+    post = get
+
+
+class AsyncViewsTest(SimpleTestCase):
+
+    def call(self, view, method):
+        request = getattr(RequestFactory(), method)('/')
+        return asyncio.run(view(request))
+
+    def test_routes_are_wrapped_only_when_enabled(self):
+        patterns = router.urls
+        with override_settings(ASYNC_VIEWS=False):
+            self.assertIs(async_routes(patterns), patterns)
+        with override_settings(ASYNC_VIEWS=True):
+            wrapped = async_routes(patterns)
+        names = set()
+        for before, after in zip(patterns, wrapped):
+            is_async = asyncio.iscoroutinefunction(after.callback)
+            self.assertEqual(is_async, before.name in ASYNC_ROUTES)
+            self.assertEqual(after.name, before.name)
+            if is_async:
+                names.add(after.name)
+        self.assertEqual(names, set(ASYNC_ROUTES))
+
+    def test_reads_run_in_pool_and_are_rendered(self):
+        view = offload(ThreadView.as_view())
+        response = self.call(view, 'get')
+        self.assertTrue(response.is_rendered)
+        self.assertEqual(response.status_code, 200)
+        threads = {self.call(view, 'get').data['thread'] for _ in range(3)}
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_writes_run_in_shared_thread(self):
+        view = offload(ThreadView.as_view())
+        first = self.call(view, 'post').data['thread']
+        self.assertEqual(self.call(view, 'post').data['thread'], first)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsgiRequestTest(TestCase):
+
+    async def test_async_read(self):
+        response = await self.async_client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+from ..authentication import token_cache_key
+from .base import PASSWORD, CatalogTestCase
+
+URL = '/api/users/me/'
+
+
+class CachedTokenAuthenticationTest(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.client_for(self.user)
+        self.key = Token.objects.get(user=self.user).key
+
+    def is_cached(self):
+        return cache.get(token_cache_key(self.key)) is not None
+
+    def test_second_request_skips_database(self):
+        self.assertEqual(self.reader.get(URL).status_code, 200)
+        self.assertTrue(self.is_cached())
+        # /me/ отдаётся целиком из закэшированного пользователя
+        with self.assertNumQueries(0):
+            response = self.reader.get(URL)
+        self.assertEqual(response.data['username'], self.user.username)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_logout(self):
+        self.reader.get(URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reader.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.is_cached())
+        self.assertEqual(self.reader.get(URL).status_code, 401)
+
+    def test_password_change(self):
+        self.reader.get(URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reader.post('/api/users/set_password/', {
+                'current_password': PASSWORD,
+                'new_password': 'Another-54321!',
+            })
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.is_cached())
+
+    def test_blocked_user(self):
+        self.reader.get(URL)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.reader.get(URL).status_code, 401)
+
+    def test_last_login_keeps_cache(self):
+        self.reader.get(URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['last_login'])
+        self.assertTrue(self.is_cached())
+
+    def test_cache_disabled(self):
+        with self.settings(AUTH_TOKEN_CACHE_TIMEOUT=0):
+            self.assertEqual(self.reader.get(URL).status_code, 200)
+        self.assertFalse(self.is_cached())
@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db.models import F
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from .base import CatalogTestCase
+
+
+class BatchRelationsTest(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.client_for(self.user)
+        self.ids = [recipe.pk for recipe in self.recipes[:3]]
+
+    def send(self, method, url, ids):
+        return getattr(self.reader, method)(
+            url, {'recipes': ids}, format='json')
+
+    def test_add_and_remove_many(self):
+        for model, url in ((Favorite, '/api/recipes/favorite/'),
+                           (ShoppingCart, '/api/recipes/shopping_cart/')):
+            with self.subTest(url=url):
+                first, *rest = self.ids
+                self.send('post', url, [first])
+                response = self.send('post', url, self.ids + [10 ** 6])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, {'added': rest})
+                self.assertEqual(
+                    self.send('post', url, self.ids).data, {'added': []})
+                self.assertEqual(
+                    model.objects.filter(user=self.user).count(), 3)
+                response = self.send('delete', url, [first, 10 ** 6])
+                self.assertEqual(response.data, {'removed': [first]})
+                self.assertCountEqual(
+                    model.objects.filter(user=self.user).values_list(
+                        'recipe_id', flat=True), rest)
+
+    def test_concurrent_add_counts_rows_once(self):
+        bulk_create = Favorite.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # Параллельный запрос успел вставить те же строки после проверки
+            bulk_create([Favorite(user=self.user, recipe_id=pk)
+                         for pk in self.ids])
+            Recipe.objects.filter(pk__in=self.ids).update(
+                favorites_count=F('favorites_count') + 1)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Favorite.objects, 'bulk_create',
+                               racing_bulk_create):
+            self.send('post', '/api/recipes/favorite/', self.ids)
+        self.assertEqual(
+            list(Recipe.objects.filter(pk__in=self.ids).values_list(
+                'favorites_count', flat=True)), [1, 1, 1])
+
+    def test_invalid_lists(self):
+        url = '/api/recipes/favorite/'
+        too_many = list(range(1, settings.RECIPES_BATCH_MAX + 2))
+        for ids in ([], [0], ['x'], too_many):
+            with self.subTest(size=len(ids)):
+                self.assertEqual(
+                    self.send('post', url, ids).status_code, 400)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_single_recipe_is_idempotent(self):
+        url = f'/api/recipes/{self.ids[0]}/shopping_cart/'
+        self.assertEqual(self.reader.post(url).status_code, 201)
+        self.assertEqual(self.reader.post(url).status_code, 200)
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+        self.assertEqual(self.reader.delete(url).status_code, 204)
+        self.assertEqual(self.reader.delete(url).status_code, 204)
+        self.assertFalse(ShoppingCart.objects.exists())
+
+    def test_requires_authentication(self):
+        response = self.client.post(
+            '/api/recipes/favorite/', {'recipes': self.ids}, format='json')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,74 @@
+from recipes.models import Tag
+from .base import CatalogTestCase
+
+
+class ConditionalGetTest(CatalogTestCase):
+
+    def assert_not_modified(self, client, url, **headers):
+        response = client.get(url, **headers)
+        self.assertEqual(response.status_code, 304, url)
+        self.assertEqual(response.content, b'')
+        return response
+
+    def test_unchanged_resources(self):
+        detail = f'/api/recipes/{self.recipes[0].pk}/'
+        for url in ('/api/tags/', f'/api/tags/{self.tags[0].pk}/',
+                    '/api/ingredients/', '/api/ingredients/?name=со',
+                    '/api/recipes/', detail):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Authorization', response['Vary'])
+                not_modified = self.assert_not_modified(
+                    self.client, url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_last_modified(self):
+        url = f'/api/recipes/{self.recipes[0].pk}/'
+        response = self.client.get(url)
+        self.assert_not_modified(
+            self.client, url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
+    def test_changed_tag(self):
+        url = '/api/tags/'
+        etag = self.client.get(url)['ETag']
+        Tag.objects.filter(pk=self.tags[0].pk).update(name='Новое имя')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_changed_recipe(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.pk}/'
+        etag = self.client.get(url)['ETag']
+        recipe.name = 'Новое имя'
+        recipe.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Новое имя')
+
+    def test_renamed_author(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.pk}/'
+        etag = self.client.get(url)['ETag']
+        author = recipe.author
+        author.save(update_fields=['last_login'])
+        self.assert_not_modified(self.client, url, HTTP_IF_NONE_MATCH=etag)
+        author.first_name = 'Новое имя'
+        author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['author']['first_name'], 'Новое имя')
+
+    def test_user_flags_change_etag(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.pk}/'
+        client = self.client_for(self.user)
+        etag = client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+        self.assert_not_modified(client, url, HTTP_IF_NONE_MATCH=etag)
+        client.post(f'/api/recipes/{recipe.pk}/favorite/')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
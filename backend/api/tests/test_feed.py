@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from recipes.feed import fan_out_recipe
+from recipes.models import FeedEntry
+from .base import CatalogTestCase
+
+URL = '/api/recipes/feed/'
+
+
+@override_settings(JOBS_EAGER=True)
+class FeedTest(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.client_for(self.user)
+        self.author = self.authors[0]
+
+    def subscribe(self, client=None):
+        client = client or self.reader
+        response = client.post(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+
+    def feed_ids(self, url=f'{URL}?limit=5'):
+        ids = []
+        while url:
+            response = self.reader.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def author_ids(self):
+        return [recipe.pk for recipe in reversed(self.recipes)
+                if recipe.author_id == self.author.pk]
+
+    def test_subscribe_backfills_feed(self):
+        self.assertEqual(self.feed_ids(), [])
+        self.subscribe()
+        self.assertEqual(self.feed_ids(), self.author_ids())
+        with self.settings(FEED_BACKFILL=2):
+            other = self.create_user('other')
+            self.client_for(other).post(
+                f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(
+            FeedEntry.objects.filter(user=other).count(), 2)
+
+    def test_new_recipe_fans_out(self):
+        self.subscribe()
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe(self.author, 'Новый рецепт')
+        self.assertEqual(self.feed_ids()[0], recipe.pk)
+        fan_out_recipe(recipe.pk)
+        self.assertEqual(
+            FeedEntry.objects.filter(recipe=recipe).count(), 1)
+
+    def test_fan_out_in_batches(self):
+        followers = [self.create_user(f'follower{i}') for i in range(3)]
+        for follower in followers:
+            self.subscribe(self.client_for(follower))
+        FeedEntry.objects.all().delete()
+        with mock.patch('recipes.feed.FAN_OUT_BATCH_SIZE', 2):
+            fan_out_recipe(self.recipes[0].pk)
+        self.assertCountEqual(
+            FeedEntry.objects.values_list('user_id', flat=True),
+            [follower.pk for follower in followers])
+
+    def test_unsubscribe_trims_feed(self):
+        self.subscribe()
+        self.reader.delete(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(self.feed_ids(), [])
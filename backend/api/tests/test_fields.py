@@ -0,0 +1,56 @@
+from base64 import b64encode, encodebytes
+from io import BytesIO
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from ..fields import Base64ImageField
+
+
+def png_bytes(size=(64, 48)):
+    buffer = BytesIO()
+    Image.effect_noise(size, 50).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+
+    def decode(self, encoded):
+        field = Base64ImageField()
+        return field.to_internal_value(f'data:image/png;base64,{encoded}')
+
+    def test_decodes_in_chunks(self):
+        content = png_bytes()
+        # Маленькие куски, чтобы изображение резалось на десятки частей
+        with mock.patch('api.fields.DECODE_CHUNK_SIZE', 100):
+            for name, encoded in (
+                ('plain', b64encode(content).decode()),
+                ('wrapped', encodebytes(content).decode()),
+                ('crlf', encodebytes(content).decode().replace(
+                    '\n', '\r\n')),
+            ):
+                with self.subTest(name):
+                    file = self.decode(encoded)
+                    self.assertEqual(file.read(), content)
+                    self.assertEqual(file.name, 'temp.png')
+
+    def test_rejects_broken_base64(self):
+        encoded = b64encode(png_bytes()).decode()
+        with self.assertRaises(ValidationError):
+            self.decode(encoded[:-1])
+        with self.assertRaises(ValidationError):
+            self.decode('не картинка')
+
+    @override_settings(IMAGE_MAX_SIZE=1024 * 1024)
+    def test_rejects_large_file(self):
+        # Размер оценивается по длине строки, без декодирования
+        with self.assertRaisesMessage(ValidationError, '1 МБ'):
+            self.decode('A' * (2 * 1024 * 1024))
+
+    @override_settings(IMAGE_MAX_SIDE=32)
+    def test_rejects_large_resolution(self):
+        encoded = b64encode(png_bytes((64, 16))).decode()
+        with self.assertRaisesMessage(ValidationError, '32 px'):
+            self.decode(encoded)
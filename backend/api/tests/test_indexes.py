@@ -0,0 +1,164 @@
+from threading import Thread
+from unittest import mock
+
+from recipes.models import IngredientInRecipe
+
+from ..cache import bump_catalog_version
+from ..ingredient_index import IngredientIndex
+from ..pantry_index import PantryIndex
+from .base import CatalogTestCase
+
+
+def run_concurrently(read, change, readers=4, rounds=300):
+    """Читатели в потоках и изменения в текущем потоке одновременно.
+
+    Возвращает исключения, которые получили читатели.
+    """
+    errors = []
+    done = []
+
+    def reader():
+        try:
+            while not done:
+                read()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(rounds):
+            change()
+    finally:
+        done.append(True)
+        for thread in threads:
+            thread.join()
+    return errors
+
+
+class IngredientIndexTest(CatalogTestCase):
+
+    def test_prefix_matches_go_first(self):
+        index = IngredientIndex()
+        names = [item['name'] for item in index.search('сол')]
+        self.assertCountEqual(names, ['соль', 'соль морская'])
+        names = [item['name'] for item in index.search('сок')]
+        self.assertEqual(names, ['абрикосовый сок'])
+
+    def test_invalidate_right_after_build(self):
+        index = IngredientIndex()
+        build = index._build
+
+        def build_then_invalidate():
+            # Другой поток сбросил индекс, пока этот его собирал
+            built = build()
+            index.invalidate()
+            return built
+
+        with mock.patch.object(index, '_build', build_then_invalidate):
+            names = [item['name'] for item in index.search('мук')]
+        self.assertEqual(names, ['мука'])
+
+    def test_invalidate_does_not_break_readers(self):
+        index = IngredientIndex()
+        # Сборка без базы: у потоков тестов своё соединение
+        # и они не видят данных незафиксированной транзакции
+        built = index._build()
+        expected = index.search('со')
+        results = []
+
+        def read():
+            results.append(index.search('со'))
+
+        with mock.patch.object(index, '_build', return_value=built):
+            errors = run_concurrently(read, index.invalidate)
+        self.assertEqual(errors, [])
+        self.assertTrue(results)
+        for result in results:
+            self.assertEqual(result, expected)
+
+
+class PantryIndexTest(CatalogTestCase):
+
+    def recipe_ids(self, query):
+        response = self.client.get(f'/api/recipes/?limit=50&{query}')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def recipes_by_number(self, *numbers):
+        return {
+            recipe.id for position, recipe in enumerate(self.recipes)
+            if position % self.recipes_per_author in numbers
+        }
+
+    def test_filters(self):
+        self.check_filters()
+
+    def test_filters_in_database(self):
+        # Списки id длиннее MAX_IN_IDS фильтруются подзапросами
+        with mock.patch('api.filters.MAX_IN_IDS', 1):
+            self.check_filters()
+
+    def check_filters(self):
+        first, second, third, *_, last = (
+            ingredient.id for ingredient in self.ingredients)
+        pantry = f'{first},{second},{third}'
+        self.assertEqual(
+            self.recipe_ids(f'pantry={pantry}'), self.recipes_by_number(0))
+        self.assertEqual(
+            self.recipe_ids(f'pantry={pantry}&max_missing=1'),
+            self.recipes_by_number(0, 1))
+        self.assertEqual(
+            self.recipe_ids(f'ingredients={last}'),
+            self.recipes_by_number(3))
+        self.assertEqual(
+            self.recipe_ids(f'exclude_ingredients={first}'),
+            self.recipes_by_number(1, 2, 3))
+
+    def test_sync_picks_up_changed_recipe(self):
+        index = PantryIndex()
+        recipe = self.recipes[0]
+        last = self.ingredients[-1].id
+        self.assertNotIn(recipe.id, index.containing_all([last]))
+        IngredientInRecipe.objects.create(
+            recipe=recipe, ingredient_id=last, amount=1)
+        recipe.save()
+        bump_catalog_version()
+        self.assertIn(recipe.id, index.containing_all([last]))
+
+    @mock.patch('api.pantry_index.get_catalog_version', return_value=1)
+    def test_sync_without_version_change(self, _):
+        # Рецепт изменил другой процесс: версия в locmem этого не видит
+        index = PantryIndex()
+        recipe = self.recipes[0]
+        last = self.ingredients[-1].id
+        with self.settings(PANTRY_INDEX_SYNC_INTERVAL=60):
+            self.assertNotIn(recipe.id, index.containing_all([last]))
+            IngredientInRecipe.objects.create(
+                recipe=recipe, ingredient_id=last, amount=1)
+            recipe.save()
+            self.assertNotIn(recipe.id, index.containing_all([last]))
+        with self.settings(PANTRY_INDEX_SYNC_INTERVAL=0):
+            self.assertIn(recipe.id, index.containing_all([last]))
+
+    def test_sync_keeps_old_snapshot_intact(self):
+        index = PantryIndex()
+        before = index._snapshot()
+        postings = {
+            pk: list(ids) for pk, ids in before.postings.items()}
+        by_size = dict(before.by_size)
+        recipes = dict(before.recipes)
+        recipe = self.recipes[0]
+        IngredientInRecipe.objects.filter(recipe=recipe).delete()
+        recipe.save()
+        bump_catalog_version()
+        after = index._snapshot()
+        self.assertIsNot(after, before)
+        self.assertNotIn(recipe.id, after.recipes)
+        # Читатель, взявший прежний снимок, видит его целиком
+        self.assertEqual(
+            {pk: list(ids) for pk, ids in before.postings.items()},
+            postings)
+        self.assertEqual(before.by_size, by_size)
+        self.assertEqual(before.recipes, recipes)
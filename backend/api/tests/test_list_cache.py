@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from ..cache import get_catalog_version
+from .base import CatalogTestCase
+from .test_queries import RECIPE_LIST_QUERIES
+
+URL = '/api/recipes/'
+
+
+class RecipeListCacheTest(CatalogTestCase):
+
+    def names(self, url=URL):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {recipe['name'] for recipe in response.data['results']}
+
+    def test_recipe_change_invalidates_pages(self):
+        recipe = self.recipes[-1]
+        self.assertIn(recipe.name, self.names())
+        recipe.name = 'Новое имя'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertIn('Новое имя', self.names())
+
+    def test_author_change_invalidates_pages(self):
+        author = self.recipes[-1].author
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save(update_fields=['last_login'])
+        self.assertEqual(get_catalog_version(), version)
+        author.first_name = 'Иван'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_params_are_normalized(self):
+        self.client.get(f'{URL}?limit=3&page=2&utm_source=mail')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'{URL}?page=2&limit=3')
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_search_is_not_cached(self):
+        self.client.get(f'{URL}?search=рецепт')
+        with self.assertNumQueries(RECIPE_LIST_QUERIES):
+            self.client.get(f'{URL}?search=рецепт')
+
+    @override_settings(RECIPE_LIST_CACHE_TIMEOUT=42)
+    def test_entries_expire(self):
+        with mock.patch('api.views.cache.set', wraps=cache.set) as set_:
+            self.client.get(URL)
+        set_.assert_called_once()
+        self.assertEqual(set_.call_args.args[2], 42)
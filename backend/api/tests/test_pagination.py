@@ -0,0 +1,61 @@
+from base64 import urlsafe_b64encode
+
+from django.utils import timezone
+
+from recipes.models import Recipe
+from .base import CatalogTestCase
+
+
+def encode(value):
+    return urlsafe_b64encode(value.encode()).decode()
+
+
+class CursorPaginationTest(CatalogTestCase):
+
+    def walk(self, url):
+        """id рецептов со всех страниц по ссылкам next."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def expected_ids(self):
+        return list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+    def test_pages_cover_all_recipes(self):
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=5'), self.expected_ids())
+
+    def test_same_pub_date(self):
+        Recipe.objects.update(pub_date=timezone.now())
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=5'), self.expected_ids())
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage!!', encode('foo,1'),
+                       encode('2024-01-01T00:00:00,abc'), encode('1')):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/api/recipes/?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+    def test_other_ordering_is_rejected(self):
+        for query in ('ordering=trending', 'ordering=-favorites',
+                      'ordering=pub_date', 'search=абрикос'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/recipes/?cursor=&{query}')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=5&ordering=-pub_date'),
+            self.expected_ids())
+
+    def test_page_numbers_without_cursor(self):
+        response = self.client.get('/api/recipes/?limit=5&page=2')
+        self.assertEqual(response.data['count'], len(self.recipes))
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            self.expected_ids()[5:10])
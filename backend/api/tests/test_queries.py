@@ -0,0 +1,89 @@
+from .base import CatalogTestCase
+
+# Счётчик рецептов, страница рецептов, теги и ингредиенты рецептов
+RECIPE_LIST_QUERIES = 4
+# Токен и три множества id пользователя: избранное, корзина, подписки
+FIRST_REQUEST_QUERIES = 4
+
+
+class QueryCountTest(CatalogTestCase):
+    """Число запросов к базе не зависит от размера страницы."""
+
+    def setUp(self):
+        super().setUp()
+        self.add_relations(self.user)
+        self.reader = self.client_for(self.user)
+
+    def warm_up(self, client, url):
+        """Первый запрос загружает токен и множества id в кэш."""
+        self.assertEqual(client.get(url).status_code, 200)
+
+    def test_recipe_list_anonymous(self):
+        for limit in (3, 12):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    response = self.client.get(
+                        f'/api/recipes/?limit={limit}')
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_recipe_list_anonymous_cached(self):
+        self.client.get('/api/recipes/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/recipes/')
+
+    def test_recipe_list_authenticated(self):
+        with self.assertNumQueries(
+                RECIPE_LIST_QUERIES + FIRST_REQUEST_QUERIES):
+            self.reader.get('/api/recipes/?limit=3')
+        for limit in (3, 12):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    response = self.reader.get(
+                        f'/api/recipes/?limit={limit}')
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_recipe_list_flags(self):
+        response = self.reader.get(f'/api/recipes/?limit={len(self.recipes)}')
+        favorites = {recipe.pk for recipe in self.recipes[::2]}
+        for item in response.data['results']:
+            self.assertEqual(item['is_favorited'], item['id'] in favorites)
+            self.assertEqual(
+                item['is_in_shopping_cart'], item['id'] in favorites)
+            self.assertTrue(item['author']['is_subscribed'])
+
+    def test_recipe_detail(self):
+        url = f'/api/recipes/{self.recipes[0].pk}/'
+        with self.assertNumQueries(RECIPE_LIST_QUERIES - 1):
+            self.client.get(url)
+        self.warm_up(self.reader, url)
+        with self.assertNumQueries(RECIPE_LIST_QUERIES - 1):
+            response = self.reader.get(url)
+        self.assertTrue(response.data['is_favorited'])
+
+    def test_subscriptions(self):
+        url = '/api/users/subscriptions/'
+        self.warm_up(self.reader, url)
+        for recipes_limit in (1, 3):
+            with self.subTest(recipes_limit=recipes_limit):
+                # Счётчик, страница авторов, их последние рецепты
+                with self.assertNumQueries(3):
+                    response = self.reader.get(
+                        f'{url}?recipes_limit={recipes_limit}')
+                self.assertEqual(response.data['count'], self.authors_count)
+                for author in response.data['results']:
+                    self.assertEqual(len(author['recipes']), recipes_limit)
+                    self.assertEqual(author['recipes_count'],
+                                     self.recipes_per_author)
+
+    def test_ingredients(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/ingredients/')
+        # Индекс автодополнения строится одним запросом и дальше
+        # обслуживает поиск без базы
+        with self.assertNumQueries(1):
+            self.client.get('/api/ingredients/?name=со')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/ingredients/?name=абр')
+        self.assertCountEqual(
+            [item['name'] for item in response.data],
+            ['абрикос', 'абрикосовый сок'])
@@ -0,0 +1,61 @@
+from recipes.models import IngredientInRecipe
+from .base import CatalogTestCase
+
+
+class RecipeUpdateTest(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipes[0]
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+        self.author = self.client_for(self.recipe.author)
+
+    def rows(self):
+        return {
+            row.ingredient_id: row for row in
+            IngredientInRecipe.objects.filter(recipe=self.recipe)
+        }
+
+    def patch(self, data):
+        return self.author.patch(self.url, data, format='json')
+
+    def test_only_difference_is_written(self):
+        before = self.rows()
+        kept, changed, removed = before
+        added = next(ingredient.pk for ingredient in self.ingredients
+                     if ingredient.pk not in before)
+        response = self.patch({'ingredients': [
+            {'id': kept, 'amount': before[kept].amount},
+            {'id': changed, 'amount': 77},
+            {'id': added, 'amount': 5},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        after = self.rows()
+        self.assertCountEqual(after, [kept, changed, added])
+        self.assertEqual(after[kept].pk, before[kept].pk)
+        self.assertEqual(after[changed].pk, before[changed].pk)
+        self.assertEqual(after[changed].amount, 77)
+        self.assertNotIn(removed, after)
+
+    def test_fields_without_ingredients(self):
+        before = {pk: row.amount for pk, row in self.rows().items()}
+        tag = self.tags[-1]
+        response = self.patch({'name': 'Новое имя', 'tags': [tag.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое имя')
+        self.assertEqual(list(self.recipe.tags.all()), [tag])
+        self.assertEqual(
+            {pk: row.amount for pk, row in self.rows().items()}, before)
+
+    def test_invalid_update_changes_nothing(self):
+        before = {pk: row.amount for pk, row in self.rows().items()}
+        response = self.patch({'name': 'Новое имя', 'ingredients': [
+            {'id': self.ingredients[0].pk, 'amount': 5},
+            {'id': 10 ** 6, 'amount': 5},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.name, 'Новое имя')
+        self.assertEqual(
+            {pk: row.amount for pk, row in self.rows().items()}, before)
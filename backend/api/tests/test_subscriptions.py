@@ -0,0 +1,37 @@
+from .base import CatalogTestCase
+
+URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsTest(CatalogTestCase):
+
+    def test_latest_recipes_of_each_author(self):
+        self.add_relations(self.user)
+        response = self.client_for(self.user).get(f'{URL}?recipes_limit=2')
+        self.assertEqual(response.status_code, 200)
+        for author in response.data['results']:
+            latest = sorted(
+                recipe.pk for recipe in self.recipes
+                if recipe.author_id == author['id'])[-2:]
+            self.assertCountEqual(
+                [recipe['id'] for recipe in author['recipes']], latest)
+
+    def test_recipes_limit_is_bounded(self):
+        self.add_relations(self.user)
+        client = self.client_for(self.user)
+        with self.settings(RECIPES_LIMIT_MAX=1):
+            for query in ('', '?recipes_limit=100', '?recipes_limit=-1',
+                          '?recipes_limit=abc'):
+                with self.subTest(query=query):
+                    response = client.get(f'{URL}{query}')
+                    for author in response.data['results']:
+                        self.assertEqual(len(author['recipes']), 1)
+
+    def test_no_subscriptions(self):
+        response = self.client_for(self.user).get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(response.data['results'], [])
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(URL).status_code, 401)
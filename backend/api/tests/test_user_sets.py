@@ -0,0 +1,67 @@
+from array import array
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from ..user_sets import UserSets, user_sets_key
+from .base import CatalogTestCase
+
+
+class UserSetsTest(SimpleTestCase):
+
+    def test_cache_round_trip(self):
+        user_sets = UserSets(favorites=array('q'))
+        for pk in (5, 1, 3, 3):
+            user_sets.add('favorites', pk)
+        user_sets.discard('favorites', 3)
+        user_sets.discard('favorites', 4)
+        restored = UserSets.from_cache(user_sets.to_cache())
+        self.assertEqual(list(restored.ids('favorites')), [1, 5])
+        self.assertTrue(restored.contains('favorites', 5))
+        self.assertFalse(restored.contains('favorites', 3))
+
+
+class WriteThroughTest(CatalogTestCase):
+    """Изменения через API сразу видны во флагах списка."""
+
+    def setUp(self):
+        super().setUp()
+        self.reader = self.client_for(self.user)
+        self.recipe = self.recipes[0]
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def cached_ids(self, name):
+        data = cache.get(user_sets_key(self.user.pk))
+        return list(UserSets.from_cache(data).ids(name))
+
+    def test_favorite_and_cart(self):
+        for action, flag, name in (
+                ('favorite', 'is_favorited', 'favorites'),
+                ('shopping_cart', 'is_in_shopping_cart', 'shopping_cart')):
+            with self.subTest(action=action):
+                self.assertFalse(self.reader.get(self.url).data[flag])
+                self.reader.post(f'{self.url}{action}/')
+                self.assertEqual(self.cached_ids(name), [self.recipe.pk])
+                self.assertTrue(self.reader.get(self.url).data[flag])
+                self.reader.delete(f'{self.url}{action}/')
+                self.assertEqual(self.cached_ids(name), [])
+                self.assertFalse(self.reader.get(self.url).data[flag])
+
+    def test_subscription(self):
+        author = self.recipe.author
+        subscribe = f'/api/users/{author.pk}/subscribe/'
+        self.reader.post(subscribe)
+        self.assertEqual(self.cached_ids('subscriptions'), [author.pk])
+        self.assertTrue(
+            self.reader.get(self.url).data['author']['is_subscribed'])
+        self.reader.delete(subscribe)
+        self.assertFalse(
+            self.reader.get(self.url).data['author']['is_subscribed'])
+
+    def test_timeout(self):
+        with self.settings(USER_SETS_CACHE_TIMEOUT=5), \
+                mock.patch.object(cache, 'set') as cache_set:
+            self.reader.get(self.url)
+        cache_set.assert_any_call(
+            user_sets_key(self.user.pk), mock.ANY, 5)
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import async_routes
 from .views import (
     IngredientModelViewSet,
     RecipeModelViewSet,
@@ -15,6 +16,6 @@ router.register(r'recipes', RecipeModelViewSet, basename='recipes')
 router.register(r'ingredients', IngredientModelViewSet, basename='ingredients')
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(async_routes(router.urls))),
     path(r'auth/', include('djoser.urls.authtoken'))
 ]
@@ -0,0 +1,104 @@
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'subscriptions': (Subscription, 'author_id'),
+}
+
+
+def user_sets_key(user_id):
+    return f'user_sets:{user_id}'
+
+
+class UserSets:
+    """Идентификаторы избранного, корзины и подписок пользователя.
+
+    Каждое множество хранится отсортированным массивом 64-битных
+    целых: в кэше это компактная строка байт, а проверка вхождения
+    делается бинарным поиском без обращения к базе.
+    """
+
+    def __init__(self, **sets):
+        self.sets = sets
+
+    @classmethod
+    def load(cls, user_id):
+        return cls(**{
+            name: array('q', sorted(model.objects.filter(
+                user_id=user_id).values_list(field, flat=True)))
+            for name, (model, field) in RELATIONS.items()
+        })
+
+    @classmethod
+    def from_cache(cls, data):
+        sets = {}
+        for name, raw in data.items():
+            sets[name] = array('q')
+            sets[name].frombytes(raw)
+        return cls(**sets)
+
+    def to_cache(self):
+        return {name: ids.tobytes() for name, ids in self.sets.items()}
+
+    def contains(self, name, pk):
+        ids = self.sets[name]
+        position = bisect_left(ids, pk)
+        return position < len(ids) and ids[position] == pk
+
+    def ids(self, name):
+        return self.sets[name]
+
+    def add(self, name, pk):
+        if not self.contains(name, pk):
+            insort(self.sets[name], pk)
+
+    def discard(self, name, pk):
+        if self.contains(name, pk):
+            self.sets[name].remove(pk)
+
+
+def relation_name(model):
+    return next(
+        name for name, (relation_model, _) in RELATIONS.items()
+        if relation_model is model
+    )
+
+
+def get_user_sets(request):
+    """Множества текущего пользователя, загружаемые раз за запрос."""
+    user_sets = getattr(request, '_user_sets', None)
+    if user_sets is None:
+        key = user_sets_key(request.user.pk)
+        data = cache.get(key)
+        if data is None:
+            user_sets = UserSets.load(request.user.pk)
+            cache.set(key, user_sets.to_cache(),
+                      settings.USER_SETS_CACHE_TIMEOUT)
+        else:
+            user_sets = UserSets.from_cache(data)
+        request._user_sets = user_sets
+    return user_sets
+
+
+def update_user_sets(request, name, pks, added):
+    """Сквозная запись: изменение сразу отражается в кэше.
+
+    С locmem запись видна только своему процессу, остальные увидят
+    её через USER_SETS_CACHE_TIMEOUT секунд.
+    """
+    user_sets = get_user_sets(request)
+    for pk in pks:
+        if added:
+            user_sets.add(name, pk)
+        else:
+            user_sets.discard(name, pk)
+    cache.set(user_sets_key(request.user.pk), user_sets.to_cache(),
+              settings.USER_SETS_CACHE_TIMEOUT)
@@ -1,5 +1,17 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import (
+    BooleanField,
+    Prefetch,
+    Value,
+    prefetch_related_objects,
+)
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
@@ -9,48 +21,80 @@ from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from jobs.models import Job
+from jobs.queue import enqueue
+from recipes.export import EXPORTS, shopping_list, stream_shopping_list
+from recipes.feed import backfill_feed, trim_feed
 from recipes.generate_pdf import generate_pdf
 from recipes.models import (
     Favorite,
+    FeedEntry,
     Ingredient,
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    SimilarRecipe,
     Tag,
 )
 from users.models import Subscription, User
-from .methods import post_or_delete_method
+from .methods import (
+    get_recipes_limit,
+    limited_recipes,
+    post_or_delete_many,
+    post_or_delete_method,
+)
+from .mixins import ConditionalGetMixin
+from .cache import recipe_list_cache_key
 from .filters import IngredientFilter, RecipeFilter
+from .ingredient_index import ingredient_index
 from .pagination import CustomPagination
+from .renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
 from .serializers import (
     FavoriteRecipeSerializer,
     IngredientSerializer,
     RecipeCreateSerializer,
+    RecipeIdsSerializer,
     RecipeListSerializer,
+    RecipeSerializer,
     ShoppingCartSerializer,
     SubscriptionSerializer,
     TagSerializer,
     UsersSerializer,
 )
+from .user_sets import get_user_sets, update_user_sets
 
 
-class TagModelViewSet(ReadOnlyModelViewSet):
+class TagModelViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, )
     pagination_class = None
 
 
-class IngredientModelViewSet(ReadOnlyModelViewSet):
+class IngredientModelViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     pagination_class = None
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, )
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """Автодополнение по названию обслуживается индексом в памяти."""
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        ingredients = ingredient_index.search(name)
+        not_modified, etag, last_modified = self.conditional_response(
+            request, ingredients)
+        if not_modified is not None:
+            return not_modified
+        return self.set_validators(
+            Response(ingredients), etag, last_modified)
+
 
 class UsersModelViewSet(UserViewSet):
     queryset = User.objects.all()
@@ -75,13 +119,20 @@ class UsersModelViewSet(UserViewSet):
                                 status=status.HTTP_400_BAD_REQUEST)
             serializer = SubscriptionSerializer(author,
                                                 context={'request': request})
-            Subscription.objects.create(user=user, author=author)
+            with transaction.atomic():
+                Subscription.objects.create(user=user, author=author)
+                backfill_feed(user.id, author.id)
+            update_user_sets(request, 'subscriptions', (author.id,),
+                             added=True)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if not is_subscribed:
             return Response({'У вас нет подписки на этого автора'},
                             status=status.HTTP_400_BAD_REQUEST)
-        Subscription.objects.filter(user=user, author=author).delete()
+        with transaction.atomic():
+            Subscription.objects.filter(user=user, author=author).delete()
+            trim_feed(user.id, author.id)
+        update_user_sets(request, 'subscriptions', (author.id,), added=False)
         return Response(
             {'Вы отписались от этого автора'}, status=status.HTTP_200_OK
         )
@@ -89,25 +140,95 @@ class UsersModelViewSet(UserViewSet):
     @action(methods=['GET'], detail=False,
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        queryset = User.objects.filter(
+            following__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('id')
         page = self.paginate_queryset(queryset)
+        prefetch_related_objects(page, Prefetch(
+            'recipes',
+            queryset=limited_recipes(page, get_recipes_limit(request)),
+            to_attr='limited_recipes'
+        ))
         serializer = SubscriptionSerializer(
             page, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class RecipeModelViewSet(ModelViewSet):
+class RecipeModelViewSet(ConditionalGetMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
     permission_classes = (IsAuthenticatedOrReadOnly, )
     pagination_class = CustomPagination
     pagination_class.page_size = 6
+    cursor_ordering = ('pub_date', 'id')
+    feed_ordering = ('pub_date', 'recipe_id')
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_queryset(self):
+        """Рецепты со связями, подгружаемыми пачкой.
+
+        Количество запросов не зависит от размера страницы, а флаги
+        избранного, корзины и подписки берутся из множеств
+        пользователя в памяти.
+        """
+        return self.queryset.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'IngredientInRecipe',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient')
+            ),
+        )
+
+    def get_object_etag(self, obj):
+        if self.request.user.is_anonymous:
+            return obj.pk, obj.updated_at
+        user_sets = get_user_sets(self.request)
+        return (obj.pk, obj.updated_at,
+                user_sets.contains('favorites', obj.pk),
+                user_sets.contains('shopping_cart', obj.pk),
+                user_sets.contains('subscriptions', obj.author_id))
+
+    def get_last_modified(self, objects):
+        return max((obj.updated_at for obj in objects), default=None)
+
+    def list(self, request, *args, **kwargs):
+        """Страницы для анонимных пользователей берутся из кэша.
+
+        Ключ содержит версию каталога, которую сигналы сдвигают при
+        любом изменении рецептов. Версия видна другим процессам только
+        через общий кэш, поэтому записи живут не дольше
+        RECIPE_LIST_CACHE_TIMEOUT секунд: так ограничено и отставание
+        процессов с locmem, и число старых ключей в redis.
+        Поисковые запросы не кэшируются: их слишком много разных.
+        """
+        if (not request.user.is_anonymous
+                or 'search' in request.query_params):
+            return super().list(request, *args, **kwargs)
+        cache_key = recipe_list_cache_key(request)
+        cached = cache.get(cache_key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(cache_key, (
+                    response.data,
+                    response['ETag'],
+                    parse_http_date_safe(response.get('Last-Modified', '')),
+                ), settings.RECIPE_LIST_CACHE_TIMEOUT)
+            return response
+        data, etag, last_modified = cached
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(data)
+        return self.set_validators(response, etag, last_modified)
+
     def get_serializer_class(self):
-        if self.action in SAFE_METHODS:
+        if self.request.method in SAFE_METHODS:
             return RecipeListSerializer
         return RecipeCreateSerializer
 
@@ -130,16 +251,111 @@ class RecipeModelViewSet(ModelViewSet):
             Favorite, FavoriteRecipeSerializer, request, **kwargs)
         return response
 
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='favorite',
+        url_name='favorite_many',
+        permission_classes=[IsAuthenticated, ]
+    )
+    def favorite_many(self, request):
+        return post_or_delete_many(Favorite, RecipeIdsSerializer, request)
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        url_path='shopping_cart',
+        url_name='shopping_cart_many',
+        permission_classes=[IsAuthenticated, ]
+    )
+    def shopping_cart_many(self, request):
+        return post_or_delete_many(ShoppingCart, RecipeIdsSerializer, request)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk):
+        """Заранее рассчитанные похожие рецепты, самые близкие первыми"""
+        entries = SimilarRecipe.objects.filter(
+            recipe_id=pk).select_related('similar').order_by('-score')
+        if not entries and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        serializer = RecipeSerializer(
+            [entry.similar for entry in entries], many=True,
+            context={'request': request})
+        return Response(serializer.data)
+
+    @action(methods=['GET'], detail=False,
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Рецепты авторов из подписок, всегда с пагинацией по ключу."""
+        queryset = FeedEntry.objects.filter(
+            user=request.user).select_related('recipe__author')
+        self.paginator.cursor_fields = self.feed_ordering
+        page = self.paginator.paginate_keyset(queryset, request)
+        recipes = [entry.recipe for entry in page]
+        prefetch_related_objects(
+            recipes,
+            'tags',
+            Prefetch(
+                'IngredientInRecipe',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient')
+            ),
+        )
+        serializer = RecipeListSerializer(
+            recipes, many=True, context={'request': request})
+        return self.paginator.get_paginated_response(serializer.data)
+
     @action(methods=['GET'],
-            detail=False,)
+            detail=False,
+            renderer_classes=(JSONRenderer, PDFRenderer,
+                              PlainTextRenderer, CSVRenderer),
+            permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
-        """Скачавание PDF файла со списком покупок"""
-        user = request.user
-        queryset = IngredientInRecipe.objects.filter(
-            recipe__shopping_cart__user=user
-        )
-        queryset_sort = queryset.values('ingredient__name',
-                                        'ingredient__measurement_unit',
-                                        ).annotate(
-            quantity=Sum('amount')).order_by()
+        """Скачавание списка покупок.
+
+        По умолчанию отдаётся PDF, с ?format=txt|csv|json список
+        передаётся потоком прямо из агрегирующего запроса.
+        """
+        queryset_sort = shopping_list(request.user.id)
+        export_format = request.query_params.get('format')
+        if export_format in EXPORTS:
+            return stream_shopping_list(queryset_sort.iterator(),
+                                        export_format)
         return generate_pdf(queryset_sort)
+
+    @action(methods=['POST'],
+            detail=False,
+            url_path='download_shopping_cart/jobs',
+            url_name='download_shopping_cart_jobs',
+            permission_classes=[IsAuthenticated])
+    def download_shopping_cart_jobs(self, request):
+        """Постановка выгрузки списка покупок в фоновую очередь"""
+        export_format = request.data.get('format', 'pdf')
+        if export_format != 'pdf' and export_format not in EXPORTS:
+            return Response({'format': 'Доступны pdf, txt, csv и json'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        job = enqueue('export_shopping_list',
+                      user_id=request.user.id, export_format=export_format)
+        return Response({'id': job.id, 'status': job.status},
+                        status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=['GET'],
+            detail=False,
+            url_path=r'download_shopping_cart/jobs/(?P<job_id>[\d]+)',
+            url_name='download_shopping_cart_job',
+            permission_classes=[IsAuthenticated])
+    def download_shopping_cart_job(self, request, job_id):
+        """Статус выгрузки и ссылка на готовый файл"""
+        job = get_object_or_404(
+            Job, id=job_id, kind='export_shopping_list',
+            payload__user_id=request.user.id
+        )
+        data = {'id': job.id, 'status': job.status}
+        if job.status == Job.DONE:
+            name = job.result['file']
+            if default_storage.exists(name):
+                data['url'] = request.build_absolute_uri(
+                    default_storage.url(name))
+            else:
+                data['status'] = 'expired'
+        return Response(data)
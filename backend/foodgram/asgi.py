@@ -3,5 +3,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+# Под ASGI чтение рецептов, ингредиентов и тегов идёт через
+# асинхронные представления, см. api/async_views.py
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
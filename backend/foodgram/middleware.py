@@ -0,0 +1,147 @@
+import asyncio
+import time
+from hashlib import md5
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import connections
+from django.dispatch import receiver
+
+from .routers import use_replica
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def close_broken_connections():
+    """Закрывает соединения текущего потока, которые оборвала база.
+
+    Проверка - лишний запрос к базе, поэтому проверяются только
+    соединения после ошибки и простоявшие без запросов дольше
+    DB_HEALTH_CHECK_IDLE секунд: под нагрузкой проверок нет совсем.
+    """
+    idle_since = time.monotonic() - settings.DB_HEALTH_CHECK_IDLE
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        idle = getattr(connection, 'last_used_at', 0) < idle_since
+        if (idle or connection.errors_occurred) and (
+                not connection.is_usable()):
+            connection.close()
+
+
+@receiver(request_finished)
+def mark_connections_used(**kwargs):
+    """Запоминает время последнего запроса у открытых соединений."""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used_at = now
+
+
+class HybridMiddleware:
+    """Middleware, которое Django вызывает и синхронно, и асинхронно.
+
+    Синхронное middleware Django под ASGI выполняет в общем потоке
+    вместе со всей цепочкой после него, и асинхронные представления
+    теряют смысл. Наследники реализуют handle и __acall__.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class ConnectionHealthMiddleware(HybridMiddleware):
+    """Закрывает оборванные постоянные соединения до начала запроса.
+
+    Django сам замечает такие соединения только после ошибки в запросе,
+    поэтому без проверки первый запрос после перезапуска базы падает.
+    Время последнего использования отмечается по сигналу конца запроса.
+    """
+
+    def handle(self, request):
+        if settings.DB_HEALTH_CHECKS:
+            close_broken_connections()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if settings.DB_HEALTH_CHECKS:
+            await sync_to_async(close_broken_connections)()
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """Отправляет чтение безопасных запросов на реплику.
+
+    После успешной записи клиент REPLICA_STICKY_SECONDS секунд читает
+    с основной базы. Клиент с токеном определяется по заголовку
+    Authorization, без токена (вход, регистрация) - по адресу из
+    заголовка прокси CLIENT_IP_HEADER: за nginx REMOTE_ADDR у всех
+    один. Отметки хранятся в кэше, поэтому у нескольких процессов
+    он должен быть общим.
+    """
+
+    def handle(self, request):
+        if 'replica' not in settings.DATABASES:
+            return self.get_response(request)
+        keys, write_key = self.client_keys(request)
+        safe = request.method in SAFE_METHODS
+        token = use_replica.set(safe and not self.is_sticky(keys))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if not safe and response.status_code < 400:
+            self.stick(write_key)
+        return response
+
+    async def __acall__(self, request):
+        if 'replica' not in settings.DATABASES:
+            return await self.get_response(request)
+        keys, write_key = self.client_keys(request)
+        safe = request.method in SAFE_METHODS
+        sticky = await sync_to_async(
+            self.is_sticky, thread_sensitive=False)(keys)
+        token = use_replica.set(safe and not sticky)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if not safe and response.status_code < 400:
+            await sync_to_async(
+                self.stick, thread_sensitive=False)(write_key)
+        return response
+
+    def client_keys(self, request):
+        """Ключи для проверки отметки и ключ для новой отметки.
+
+        Проверяется и адрес: первый запрос с токеном сразу после входа
+        должен найти токен на основной базе. Отмечается же только
+        токен, если он есть, чтобы запись одного пользователя не
+        переводила на основную базу всех клиентов с его адреса.
+        """
+        address = (request.META.get(settings.CLIENT_IP_HEADER)
+                   or request.META.get('REMOTE_ADDR'))
+        address_key = f'db:primary:addr:{address}'
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return [address_key], address_key
+        digest = md5(authorization.encode()).hexdigest()
+        auth_key = f'db:primary:auth:{digest}'
+        return [address_key, auth_key], auth_key
+
+    def is_sticky(self, keys):
+        return bool(cache.get_many(keys))
+
+    def stick(self, key):
+        cache.set(key, True, settings.REPLICA_STICKY_SECONDS)
@@ -0,0 +1,21 @@
+from contextvars import ContextVar
+
+# Выставляется ReplicaRoutingMiddleware на время обработки запроса;
+# вне запросов (команды, обработчики задач) всё читается с основной базы
+use_replica = ContextVar('use_replica', default=False)
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+
+
+class PrimaryReplicaRouter:
+    """Чтение в безопасных запросах - с реплики, остальное - с основной."""
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if use_replica.get() else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
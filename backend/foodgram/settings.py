@@ -29,10 +29,13 @@ INSTALLED_APPS = [
     'api',
     'recipes',
     'users',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.middleware.ConnectionHealthMiddleware',
+    'foodgram.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,24 +64,81 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# Асинхронные представления для чтения; включаются в foodgram/asgi.py
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv(
+            'DB_NAME',
+            BASE_DIR / 'db.sqlite3' if 'sqlite3' in DB_ENGINE else 'postgres'
+        ),
+        'USER': os.getenv('POSTGRES_USER', ''),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        # Соединение живёт между запросами, 0 - закрывать после каждого
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
+    }
+}
+
+# Перед запросом постоянные соединения проверяются и закрываются,
+# если база их оборвала (перезапуск, failover). Проверка стоит запроса
+# SELECT 1, поэтому делается только после ошибки или если соединение
+# простаивало дольше DB_HEALTH_CHECK_IDLE секунд
+DB_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', 'True') == 'True'
+DB_HEALTH_CHECK_IDLE = int(os.getenv('DB_HEALTH_CHECK_IDLE', 30))
+
+# Реплика для чтения: задаётся хостом (PostgreSQL) или именем базы
+# (например, второй файл SQLite для локальной проверки)
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['foodgram.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи пользователь читает с основной базы,
+# чтобы не увидеть отставшую реплику
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+# Заголовок с адресом клиента от прокси: nginx передаёт X-Real-IP
+CLIENT_IP_HEADER = os.getenv('CLIENT_IP_HEADER', 'HTTP_X_REAL_IP')
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+            'redis': 'django_redis.cache.RedisCache',
+        }[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'cache') if CACHE_BACKEND == 'file' else ''
+        ),
     }
 }
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': os.getenv('DB_NAME'),
-#         'USER': os.getenv('POSTGRES_USER'),
-#         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
-#         'HOST': os.getenv('DB_HOST'),
-#         'PORT': os.getenv('DB_PORT')
-#     }
-# }
+# Время жизни кэша страниц рецептов. Версия каталога, которую сдвигают
+# обработчики задач, команды и другие процессы, видна только через общий
+# кэш, поэтому с locmem страницы живут считанные секунды
+RECIPE_LIST_CACHE_TIMEOUT = int(os.getenv(
+    'RECIPE_LIST_CACHE_TIMEOUT', 10 if CACHE_BACKEND == 'locmem' else 600))
+
+# Время жизни множеств id избранного, корзины и подписок пользователя.
+# Сквозная запись обновляет только кэш своего процесса, поэтому
+# с locmem множества тоже живут недолго
+USER_SETS_CACHE_TIMEOUT = int(os.getenv(
+    'USER_SETS_CACHE_TIMEOUT', 10 if CACHE_BACKEND == 'locmem' else 60 * 60))
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -120,13 +180,53 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
 }
 
+# Сколько секунд пользователь по токену берётся из кэша, 0 - не кэшировать
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+
+# Ограничения на загружаемые изображения рецептов
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_SIDE = 6000
+
+# Выполнять фоновые задачи сразу, без manage.py run_workers
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False') == 'True'
+
+# Задача, которая выполняется дольше, возвращается в очередь: её
+# обработчик считается упавшим. Должно быть больше самой долгой задачи
+JOBS_LEASE_TIMEOUT = int(os.getenv('JOBS_LEASE_TIMEOUT', 30 * 60))
+
+# Сколько дней хранить завершённые задачи (manage.py prune_jobs)
+JOBS_RETENTION_DAYS = int(os.getenv('JOBS_RETENTION_DAYS', 7))
+
+# Верхняя граница для параметра recipes_limit в подписках
+RECIPES_LIMIT_MAX = 20
+
+# Сколько рецептов можно добавить в избранное или корзину за один запрос
+RECIPES_BATCH_MAX = 100
+
+# Сколько последних рецептов автора попадает в ленту при подписке
+FEED_BACKFILL = 100
+
+# Сколько похожих рецептов хранится для каждого рецепта
+SIMILAR_RECIPES_K = 10
+
+# Как долго индекс автодополнения ингредиентов живёт в процессе, секунды
+INGREDIENT_INDEX_TTL = 300
+
+# Период полной перестройки индекса «ингредиент -> рецепты», секунды
+PANTRY_INDEX_TTL = 60 * 60
+# Как часто индекс догружает изменённые рецепты без смены версии
+# каталога. С locmem версия видна только своему процессу, поэтому
+# изменения из других процессов подхватываются только так
+PANTRY_INDEX_SYNC_INTERVAL = int(os.getenv(
+    'PANTRY_INDEX_SYNC_INTERVAL', 10 if CACHE_BACKEND == 'locmem' else 300))
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
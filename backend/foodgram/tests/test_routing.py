@@ -0,0 +1,155 @@
+import asyncio
+import time
+import warnings
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.db import connection
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+
+from foodgram.middleware import (
+    ConnectionHealthMiddleware,
+    ReplicaRoutingMiddleware,
+)
+from foodgram.routers import (
+    PRIMARY,
+    REPLICA,
+    PrimaryReplicaRouter,
+    use_replica,
+)
+
+
+@contextmanager
+def replica_configured():
+    """Алиас replica в настройках; соединения к нему не открываются."""
+    with warnings.catch_warnings():
+        # Django предупреждает о подмене DATABASES на лету
+        warnings.simplefilter('ignore')
+        with override_settings(DATABASES={
+                **settings.DATABASES,
+                REPLICA: settings.DATABASES[PRIMARY]}):
+            yield
+
+
+class ReplicaRoutingTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.used_replica = []
+        self.status = 200
+
+    def view(self, request):
+        self.used_replica.append(use_replica.get())
+        return HttpResponse(status=self.status)
+
+    async def async_view(self, request):
+        return self.view(request)
+
+    def request(self, method='get', ip='10.0.0.1', token=None):
+        headers = {'HTTP_X_REAL_IP': ip, 'REMOTE_ADDR': '172.17.0.1'}
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+        request = getattr(self.factory, method)('/api/recipes/', **headers)
+        ReplicaRoutingMiddleware(self.view)(request)
+        return self.used_replica[-1]
+
+    def test_router(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(None), PRIMARY)
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(None), REPLICA)
+            self.assertEqual(router.db_for_write(None), PRIMARY)
+        finally:
+            use_replica.reset(token)
+
+    def test_without_replica(self):
+        self.assertFalse(self.request())
+
+    def test_reads_go_to_replica(self):
+        with replica_configured():
+            self.assertTrue(self.request())
+            self.assertFalse(self.request('post'))
+        self.assertFalse(use_replica.get())
+
+    def test_anonymous_write_sticks_to_address(self):
+        with replica_configured():
+            self.request('post')
+            self.assertFalse(self.request())
+            # За nginx у всех один REMOTE_ADDR, но свой X-Real-IP
+            self.assertTrue(self.request(ip='10.0.0.2'))
+
+    def test_write_with_token_sticks_to_token(self):
+        with replica_configured():
+            self.request('post', token='first')
+            self.assertFalse(self.request(token='first', ip='10.0.0.9'))
+            self.assertTrue(self.request(token='second'))
+            self.assertTrue(self.request())
+
+    def test_failed_write_does_not_stick(self):
+        self.status = 400
+        with replica_configured():
+            self.request('post')
+            self.status = 200
+            self.assertTrue(self.request())
+
+    def test_async(self):
+        middleware = ReplicaRoutingMiddleware(self.async_view)
+        with replica_configured():
+            self.assertTrue(asyncio.run(
+                self.async_request(middleware, 'get')))
+            asyncio.run(self.async_request(middleware, 'post'))
+            self.assertFalse(asyncio.run(
+                self.async_request(middleware, 'get')))
+
+    async def async_request(self, middleware, method):
+        request = getattr(self.factory, method)(
+            '/api/recipes/', HTTP_X_REAL_IP='10.0.0.1')
+        await middleware(request)
+        return self.used_replica[-1]
+
+
+class ConnectionHealthTest(TestCase):
+
+    def tearDown(self):
+        connection.errors_occurred = False
+
+    def run_middleware(self, usable, idle=True):
+        connection.ensure_connection()
+        connection.last_used_at = 0 if idle else time.monotonic()
+        middleware = ConnectionHealthMiddleware(
+            lambda request: HttpResponse())
+        # Настоящее закрытие оборвало бы транзакцию теста
+        with mock.patch.object(connection, 'is_usable',
+                               return_value=usable) as is_usable, \
+                mock.patch.object(connection, 'close') as close:
+            middleware(RequestFactory().get('/'))
+        return is_usable.called, close.called
+
+    def test_idle_broken_connection_is_closed(self):
+        self.assertEqual(self.run_middleware(usable=False), (True, True))
+        self.assertEqual(self.run_middleware(usable=True), (True, False))
+        with self.settings(DB_HEALTH_CHECKS=False):
+            self.assertEqual(
+                self.run_middleware(usable=False), (False, False))
+
+    def test_busy_connection_is_not_checked(self):
+        self.assertEqual(
+            self.run_middleware(usable=False, idle=False), (False, False))
+        connection.errors_occurred = True
+        self.assertEqual(
+            self.run_middleware(usable=False, idle=False), (True, True))
+
+    def test_request_marks_connections(self):
+        connection.last_used_at = 0
+        self.client.get('/api/tags/')
+        self.assertGreater(connection.last_used_at, 0)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import prune_finished
+
+
+class Command(BaseCommand):
+    help = 'Удаление завершённых фоновых задач старше JOBS_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_finished()
+        self.stdout.write(self.style.SUCCESS(f'Удалено задач: {deleted}'))
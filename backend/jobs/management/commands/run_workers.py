@@ -0,0 +1,77 @@
+import logging
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import run_next
+
+logger = logging.getLogger(__name__)
+
+# Как часто проверять, живы ли процессы-обработчики
+SUPERVISE_INTERVAL = 5
+
+
+def work(poll_interval):
+    """Цикл обработчика: ошибка одной итерации (например, потеря
+    соединения с базой) не завершает процесс."""
+    while True:
+        try:
+            if not run_next():
+                time.sleep(poll_interval)
+        except Exception:
+            logger.exception('Ошибка обработчика задач')
+            connections.close_all()
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Запуск пула процессов, выполняющих фоновые задачи'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='Количество процессов-обработчиков'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить накопившиеся задачи и выйти'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            done = 0
+            while run_next():
+                done += 1
+            self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
+            return
+        # Соединения с базой не должны наследоваться дочерними процессами
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+
+        def start():
+            worker = context.Process(
+                target=work, args=(options['poll_interval'],))
+            worker.start()
+            return worker
+
+        workers = [start() for _ in range(options['processes'])]
+        self.stdout.write(f'Запущено обработчиков: {len(workers)}')
+        try:
+            while True:
+                time.sleep(SUPERVISE_INTERVAL)
+                for number, worker in enumerate(workers):
+                    if not worker.is_alive():
+                        logger.error(
+                            'Обработчик %s завершился с кодом %s, '
+                            'перезапуск', worker.pid, worker.exitcode)
+                        workers[number] = start()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
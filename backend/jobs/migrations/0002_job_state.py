@@ -0,0 +1,51 @@
+# Generated by Django 3.2.18 on 2026-10-18 21:02
+
+from django.db import migrations, models
+
+
+def copy_refresh_state(apps, schema_editor):
+    # Отметки прошлых пересчётов раньше читались из истории задач
+    Job = apps.get_model('jobs', 'Job')
+    JobState = apps.get_model('jobs', 'JobState')
+    states = {
+        'refresh_trending': lambda job: {
+            'landmark': job.result['landmark'],
+            'until': job.result['until'],
+        },
+        'refresh_similar_recipes': lambda job: {
+            'started_at': job.started_at.isoformat(),
+        },
+    }
+    for kind, state in states.items():
+        job = Job.objects.filter(
+            kind=kind, status='done', started_at__isnull=False
+        ).order_by('-started_at').first()
+        if job is not None:
+            JobState.objects.create(kind=kind, state=state(job))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobState',
+            fields=[
+                ('kind', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Тип задачи')),
+                ('state', models.JSONField(default=dict, verbose_name='Состояние')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Состояние задачи',
+                'verbose_name_plural': 'Состояния задач',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'finished_at'], name='job_finished_idx'),
+        ),
+        migrations.RunPython(copy_refresh_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+from django.db import models
+
+
+class Job(models.Model):
+    '''Модель фоновой задачи'''
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField(
+        verbose_name='Тип задачи',
+        max_length=100
+    )
+    payload = models.JSONField(
+        verbose_name='Параметры',
+        default=dict
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    result = models.JSONField(
+        verbose_name='Результат',
+        null=True,
+        blank=True
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True
+    )
+    started_at = models.DateTimeField(
+        verbose_name='Дата запуска',
+        null=True,
+        blank=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Дата завершения',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+            models.Index(fields=['status', 'finished_at'],
+                         name='job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.id} ({self.status})'
+
+
+class JobState(models.Model):
+    '''Состояние периодической задачи между запусками
+
+    Хранится отдельно от истории задач, которую удаляет prune_jobs.
+    '''
+    kind = models.CharField(
+        verbose_name='Тип задачи',
+        max_length=100,
+        primary_key=True
+    )
+    state = models.JSONField(
+        verbose_name='Состояние',
+        default=dict
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата обновления',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Состояние задачи'
+        verbose_name_plural = 'Состояния задач'
+
+    def __str__(self):
+        return self.kind
@@ -0,0 +1,133 @@
+import logging
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobState
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+MAX_ATTEMPTS = 3
+
+
+def task(name):
+    """Регистрирует функцию как обработчик задач типа name."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, **payload):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    При JOBS_EAGER задача выполняется сразу после фиксации транзакции,
+    без отдельного процесса обработчиков.
+    """
+    job = Job.objects.create(kind=kind, payload=payload)
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: claim_and_run(job.pk))
+    return job
+
+
+@contextmanager
+def locked_state(kind):
+    """Состояние периодической задачи под блокировкой строки.
+
+    Блокировка держится до конца транзакции, поэтому второй запуск
+    задачи того же типа ждёт первый и видит уже его состояние.
+    Изменённое state сохраняется вместе с результатами задачи.
+    """
+    with transaction.atomic():
+        job_state, _ = JobState.objects.select_for_update().get_or_create(
+            kind=kind)
+        yield job_state
+        job_state.save()
+
+
+def claim(pk):
+    """Атомарно забирает задачу: UPDATE сработает только у одного
+    обработчика, поэтому блокировки строк не нужны."""
+    return Job.objects.filter(pk=pk, status=Job.PENDING).update(
+        status=Job.RUNNING,
+        attempts=F('attempts') + 1,
+        started_at=timezone.now(),
+    ) == 1
+
+
+def claim_and_run(pk):
+    if claim(pk):
+        run(Job.objects.get(pk=pk))
+        return True
+    return False
+
+
+def run(job):
+    """Выполняет забранную задачу и записывает итог.
+
+    Итог записывается, только если задачу не успели вернуть в очередь
+    по истечении аренды и забрать снова.
+    """
+    try:
+        result = TASKS[job.kind](**job.payload)
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', job)
+        job.error = traceback.format_exc()
+        job.status = (Job.PENDING if job.attempts < MAX_ATTEMPTS
+                      else Job.FAILED)
+    else:
+        job.result = result
+        job.status = Job.DONE
+    job.finished_at = timezone.now()
+    Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, started_at=job.started_at
+    ).update(status=job.status, result=job.result, error=job.error,
+             finished_at=job.finished_at)
+
+
+def reclaim_expired():
+    """Возвращает в очередь задачи упавших обработчиков.
+
+    Задача, которая выполняется дольше JOBS_LEASE_TIMEOUT секунд,
+    считается брошенной: её обработчик завершился, не записав итог.
+    Попытка засчитывается, после MAX_ATTEMPTS задача помечается
+    ошибкой.
+    """
+    expired = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_LEASE_TIMEOUT),
+    )
+    error = 'Истекло время аренды задачи'
+    expired.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=Job.FAILED, error=error, finished_at=timezone.now())
+    return expired.update(status=Job.PENDING, error=error)
+
+
+def prune_finished():
+    """Удаляет выполненные и упавшие задачи старше JOBS_RETENTION_DAYS.
+
+    Возвращает число удалённых задач.
+    """
+    deleted, _ = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished_at__lt=timezone.now() - timedelta(
+            days=settings.JOBS_RETENTION_DAYS),
+    ).delete()
+    return deleted
+
+
+def run_next():
+    """Выполняет самую старую задачу из очереди, если она есть."""
+    reclaim_expired()
+    for pk in Job.objects.filter(
+            status=Job.PENDING).values_list('pk', flat=True)[:10]:
+        if claim_and_run(pk):
+            return True
+    return False
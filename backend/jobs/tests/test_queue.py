@@ -0,0 +1,99 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import queue
+from jobs.management.commands import run_workers
+from jobs.models import Job, JobState
+
+
+@override_settings(JOBS_LEASE_TIMEOUT=60)
+class QueueTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(queue.TASKS, {'echo': lambda **kw: kw})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def running(self, attempts=1, started=timedelta(minutes=5)):
+        return Job.objects.create(
+            kind='echo', status=Job.RUNNING, attempts=attempts,
+            started_at=timezone.now() - started)
+
+    def test_run(self):
+        job = queue.enqueue('echo', value=1)
+        self.assertTrue(queue.run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, {'value': 1})
+
+    def test_expired_jobs_are_reclaimed(self):
+        expired = self.running()
+        exhausted = self.running(attempts=queue.MAX_ATTEMPTS)
+        fresh = self.running(started=timedelta(seconds=10))
+        self.assertEqual(queue.reclaim_expired(), 1)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[expired.pk], Job.PENDING)
+        self.assertEqual(statuses[exhausted.pk], Job.FAILED)
+        self.assertEqual(statuses[fresh.pk], Job.RUNNING)
+
+    def test_reclaimed_job_runs_again(self):
+        job = self.running()
+        self.assertTrue(queue.run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_worker_does_not_overwrite_result(self):
+        stale = self.running()
+        queue.reclaim_expired()
+        queue.claim(stale.pk)
+        stale.status, stale.error = Job.RUNNING, ''
+        with mock.patch.dict(queue.TASKS, {'echo': mock.Mock(
+                side_effect=RuntimeError)}), \
+                self.assertLogs(queue.logger, 'ERROR'):
+            queue.run(stale)
+        job = Job.objects.get(pk=stale.pk)
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOBS_RETENTION_DAYS=7)
+    def test_prune_finished(self):
+        def finished(status, days):
+            return Job.objects.create(
+                kind='echo', status=status,
+                finished_at=timezone.now() - timedelta(days=days))
+        old_done = finished(Job.DONE, 8)
+        old_failed = finished(Job.FAILED, 8)
+        recent = finished(Job.DONE, 1)
+        # Задача, возвращённая в очередь, ещё не завершена
+        retried = finished(Job.PENDING, 8)
+        self.assertEqual(queue.prune_finished(), 2)
+        self.assertCountEqual(
+            Job.objects.values_list('pk', flat=True),
+            [recent.pk, retried.pk])
+        self.assertFalse(Job.objects.filter(
+            pk__in=(old_done.pk, old_failed.pk)).exists())
+
+    def test_locked_state_is_saved_with_results(self):
+        with queue.locked_state('echo') as job_state:
+            job_state.state = {'step': 1}
+        with self.assertRaises(RuntimeError):
+            with queue.locked_state('echo') as job_state:
+                job_state.state = {'step': 2}
+                raise RuntimeError
+        self.assertEqual(JobState.objects.get(kind='echo').state, {'step': 1})
+
+
+class WorkerTest(TestCase):
+
+    def test_error_does_not_stop_worker(self):
+        run_next = mock.Mock(side_effect=[RuntimeError, True, SystemExit])
+        with mock.patch.object(run_workers, 'run_next', run_next), \
+                mock.patch.object(run_workers.time, 'sleep'), \
+                self.assertLogs(run_workers.logger, 'ERROR'):
+            with self.assertRaises(SystemExit):
+                run_workers.work(poll_interval=0)
+        self.assertEqual(run_next.call_count, 3)
@@ -6,7 +6,7 @@ from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
 
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
-        'name', 'author',
+        'name', 'author', 'favorites_count', 'in_carts_count',
     )
     list_filter = ('name', 'author', 'tags')
     search_fields = ('name',)
@@ -19,9 +19,20 @@ class IngredientAdmin(admin.ModelAdmin):
     list_filter = ('name',)
 
 
-admin.site.register(Recipe)
+class RelationAdmin(admin.ModelAdmin):
+    """Счётчики рецепта сдвигают сигналы создания и удаления,
+    поэтому связь не редактируется, а удаляется и создаётся заново."""
+    list_display = ('user', 'recipe')
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ('user', 'recipe')
+        return ()
+
+
+admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag)
-admin.site.register(ShoppingCart)
-admin.site.register(Favorite)
+admin.site.register(ShoppingCart, RelationAdmin)
+admin.site.register(Favorite, RelationAdmin)
 admin.site.register(Ingredient)
 admin.site.register(IngredientInRecipe)
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Subscription
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+# Модель связи -> (модель со счётчиком, внешний ключ, поле счётчика)
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Subscription: (User, 'author_id', 'followers_count'),
+}
+
+
+def change_counter(sender, pks, delta):
+    """Сдвиг счётчика F-выражением, без чтения текущего значения."""
+    model, _, field = COUNTERS[sender]
+    model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+
+def set_counter(sender, pks=None):
+    """Запись в счётчик фактического числа связей.
+
+    Без pks пересчитываются все объекты модели со счётчиком.
+    """
+    model, foreign_key, field = COUNTERS[sender]
+    counts = sender.objects.filter(
+        **{foreign_key: OuterRef('pk')}
+    ).order_by().values(foreign_key).annotate(
+        total=Count('pk')
+    ).values('total')
+    objects = model.objects.all()
+    if pks is not None:
+        objects = objects.filter(pk__in=pks)
+    objects.update(**{field: Coalesce(Subquery(counts), 0)})
+
+
+def recount():
+    """Пересчёт всех счётчиков по фактическим данным."""
+    for sender in COUNTERS:
+        set_counter(sender)
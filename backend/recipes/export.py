@@ -0,0 +1,126 @@
+import csv
+import json
+import os
+import time
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+
+from .generate_pdf import cart_digest, render_pdf
+from .models import IngredientInRecipe
+
+FIELDS = ('ingredient__name', 'ingredient__measurement_unit', 'quantity')
+EXPORT_DIR = 'exports'
+EXPORT_TTL = 24 * 60 * 60
+
+
+def shopping_list(user_id):
+    """Ингредиенты из корзины пользователя, суммированные в базе"""
+    if user_id is None:
+        # user_id=None превратился бы в IS NULL и собрал бы весь каталог
+        raise ValueError('Список покупок строится только для пользователя')
+    return IngredientInRecipe.objects.filter(
+        recipe__shopping_cart__user_id=user_id
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        quantity=Sum('amount')
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: строка сразу отдаётся в ответ"""
+    def write(self, value):
+        return value
+
+
+def stream_txt(rows):
+    yield 'Cписок покупок:\n'
+    for obj in rows:
+        yield (f'{obj["ingredient__name"].capitalize()} '
+               f'--> {obj["quantity"]} '
+               f'{obj["ingredient__measurement_unit"]}\n')
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for obj in rows:
+        yield writer.writerow([obj[field] for field in FIELDS])
+
+
+def stream_json(rows):
+    separator = '['
+    for obj in rows:
+        yield separator + json.dumps({
+            'name': obj['ingredient__name'],
+            'measurement_unit': obj['ingredient__measurement_unit'],
+            'amount': obj['quantity'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+EXPORTS = {
+    'txt': (stream_txt, 'text/plain; charset=utf-8'),
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'json': (stream_json, 'application/json; charset=utf-8'),
+}
+
+
+def stream_shopping_list(rows, export_format):
+    """Потоковая выгрузка списка покупок в текстовом формате"""
+    stream, content_type = EXPORTS[export_format]
+    response = StreamingHttpResponse(stream(rows), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="list_in_shop.{export_format}"'
+    )
+    return response
+
+
+def remove_expired_exports():
+    """Удаление выгрузок старше EXPORT_TTL.
+
+    Просмотр всего каталога выполняется командой
+    remove_expired_exports по расписанию, а не при каждой выгрузке.
+    """
+    if not default_storage.exists(EXPORT_DIR):
+        return 0
+    expired = time.time() - EXPORT_TTL
+    removed = 0
+    for name in default_storage.listdir(EXPORT_DIR)[1]:
+        path = f'{EXPORT_DIR}/{name}'
+        if default_storage.get_modified_time(path).timestamp() < expired:
+            default_storage.delete(path)
+            removed += 1
+    return removed
+
+
+def reuse_export(name):
+    """Продлевает срок готового файла: без этого выгрузка, собранная
+    почти EXPORT_TTL назад, удалилась бы сразу после новой задачи."""
+    try:
+        os.utime(default_storage.path(name))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def export_shopping_list(user_id, export_format):
+    """Выгрузка списка покупок в файл под MEDIA_ROOT.
+
+    Имя файла — хэш содержимого, поэтому одинаковые списки покупок
+    используют один и тот же готовый файл, пока он не устарел.
+    """
+    rows = list(shopping_list(user_id))
+    name = f'{EXPORT_DIR}/{cart_digest(rows)}.{export_format}'
+    if not reuse_export(name):
+        if export_format == 'pdf':
+            content = render_pdf(rows)
+        else:
+            stream, _ = EXPORTS[export_format]
+            content = ''.join(stream(rows)).encode()
+        name = default_storage.save(name, ContentFile(content))
+    return {'file': name}
@@ -0,0 +1,54 @@
+from django.conf import settings
+
+from users.models import Subscription
+from .models import FeedEntry, Recipe
+
+FAN_OUT_BATCH_SIZE = 1000
+
+
+def feed_entry(user_id, recipe):
+    return FeedEntry(
+        user_id=user_id,
+        recipe_id=recipe['id'],
+        author_id=recipe['author_id'],
+        pub_date=recipe['pub_date'],
+    )
+
+
+def fan_out_recipe(recipe_id):
+    """Раскладывает новый рецепт по лентам подписчиков автора.
+
+    Подписчики читаются и записи вставляются пачками, повторный
+    запуск задачи ничего не дублирует.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'id', 'author_id', 'pub_date').first()
+    if recipe is None or recipe['author_id'] is None:
+        return
+    followers = Subscription.objects.filter(
+        author_id=recipe['author_id']
+    ).order_by('user_id').values_list('user_id', flat=True)
+    entries = []
+    for user_id in followers.iterator(chunk_size=FAN_OUT_BATCH_SIZE):
+        entries.append(feed_entry(user_id, recipe))
+        if len(entries) == FAN_OUT_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    if entries:
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту последние FEED_BACKFILL рецептов автора."""
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values('id', 'author_id', 'pub_date')[:settings.FEED_BACKFILL]
+    FeedEntry.objects.bulk_create(
+        [feed_entry(user_id, recipe) for recipe in recipes],
+        ignore_conflicts=True
+    )
+
+
+def trim_feed(user_id, author_id):
+    """Убирает из ленты рецепты автора одним DELETE."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
@@ -1,44 +1,90 @@
+import hashlib
+import json
 import os
-from io import BytesIO
+from functools import lru_cache
 
 from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpResponse
+from reportlab.lib.pagesizes import A4
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+FONT_NAME = 'LatoLight'
+TITLE = 'Cписок покупок'
+TITLE_FONT_SIZE = 25
+FONT_SIZE = 14
+LINE_HEIGHT = 20
+MARGIN_TOP = 60
+MARGIN_BOTTOM = 60
+CACHE_TIMEOUT = 60 * 60
 
-def generate_pdf(queryset):
-    """Создание PDF файла для отправки пользователю"""
-    buffer = BytesIO()
+
+@lru_cache(maxsize=None)
+def register_font():
+    """Шрифт разбирается один раз за время жизни процесса"""
     pdfmetrics.registerFont(
         TTFont(
-            "LatoLight", os.path.join(
+            FONT_NAME, os.path.join(
                 settings.BASE_DIR, 'recipes', 'font', 'lato-light.ttf'
             )
         )
     )
 
-    pdf_file = canvas.Canvas(buffer, bottomup=0)
-    pdf_file.setFont("LatoLight", 25)
 
-    y = 150
-    pdf_file.drawString(40, 100, text='Cписок покупок:')
-    for obj in queryset:
+def draw_header(pdf_file, page):
+    pdf_file.setFont(FONT_NAME, TITLE_FONT_SIZE)
+    pdf_file.drawString(40, MARGIN_TOP, text=TITLE)
+    pdf_file.setFont(FONT_NAME, FONT_SIZE)
+    pdf_file.drawRightString(A4[0] - 40, MARGIN_TOP, text=f'стр. {page}')
+    return MARGIN_TOP + 2 * LINE_HEIGHT
+
+
+def render_pdf(rows):
+    """Отрисовка списка покупок с переносом на новые страницы"""
+    register_font()
+    pdf_file = canvas.Canvas(None, pagesize=A4, bottomup=0)
+    page = 1
+    y = draw_header(pdf_file, page)
+    for obj in rows:
+        if y > A4[1] - MARGIN_BOTTOM:
+            pdf_file.showPage()
+            page += 1
+            y = draw_header(pdf_file, page)
         text = (f'{obj["ingredient__name"].capitalize()} '
                 f'--> {obj["quantity"]} '
                 f'{obj["ingredient__measurement_unit"]}')
-        pdf_file.drawString(100, y, text=text)
-        y += 20
-
+        pdf_file.drawString(60, y, text=text)
+        y += LINE_HEIGHT
     pdf_file.showPage()
-    pdf_file.save()
-    pdf = buffer.getvalue()
-    buffer.close()
+    return pdf_file.getpdfdata()
+
 
-    response = HttpResponse(content_type='application/pdf;  charset=utf-8')
+def cart_digest(rows):
+    """Хэш содержимого агрегированного списка покупок"""
+    return hashlib.sha256(
+        json.dumps(rows, ensure_ascii=False, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def generate_pdf(queryset):
+    """Создание PDF файла для отправки пользователю.
+
+    Готовый файл кэшируется по хэшу содержимого списка покупок,
+    поэтому повторное скачивание неизменной корзины не рендерится.
+    """
+    rows = list(queryset)
+    cache_key = f'shopping_list_pdf:{cart_digest(rows)}'
+    pdf = cache.get(cache_key)
+    if pdf is None:
+        pdf = render_pdf(rows)
+        cache.set(cache_key, pdf, CACHE_TIMEOUT)
+
+    response = HttpResponse(
+        pdf, content_type='application/pdf;  charset=utf-8'
+    )
     response['Content-Disposition'] = (
         'attachment; filename="list_in_shop.pdf"'
     )
-    response.write(pdf)
     return response
@@ -0,0 +1,107 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from jobs.queue import enqueue
+from .models import Recipe
+
+# Поле модели -> максимальный размер уменьшенной копии
+RENDITIONS = {
+    'image_card': (600, 600),
+    'image_thumbnail': (200, 200),
+}
+RENDITION_FORMAT = 'WEBP'
+RENDITION_QUALITY = 80
+# Форматы, в которых оригинал пересохраняется как есть, остальные в PNG
+KEEP_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+
+# Рецепт обновляется через update(), без post_save, поэтому о готовом
+# изображении сообщается отдельным сигналом
+image_processed = Signal()
+
+
+def schedule_image_processing(recipe):
+    """Постановка обработки изображения в очередь.
+
+    Рецепт уже должен быть сохранён со статусом IMAGE_PROCESSING,
+    до завершения задачи вместо изображения отдаётся заглушка.
+    """
+    enqueue('process_recipe_image',
+            recipe_id=recipe.pk, image=recipe.image.name)
+
+
+def encode(image, image_format, **params):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **params)
+    return ContentFile(buffer.getvalue())
+
+
+def make_renditions(recipe, image):
+    """Создание уменьшенных копий изображения рецепта в WebP"""
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGBA' if 'transparency' in image.info or 'A' in image.mode
+            else 'RGB'
+        )
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    for field, size in RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail(size)
+        getattr(recipe, field).save(
+            f'{stem}.webp',
+            encode(rendition, RENDITION_FORMAT, quality=RENDITION_QUALITY),
+            save=False
+        )
+
+
+def process_image(recipe_id, image):
+    """Пересохранение оригинала без метаданных и создание копий.
+
+    Если изображение рецепта успело смениться, задача ничего не делает:
+    для нового изображения поставлена своя задача. Результат
+    записывается условным UPDATE по исходному имени файла, поэтому
+    изображение, загруженное во время обработки, не затирается.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image).first()
+    if recipe is None:
+        return
+    current = Recipe.objects.filter(pk=recipe_id, image=image)
+    try:
+        with recipe.image.open('rb') as file:
+            original = Image.open(file)
+            image_format = original.format
+            original = ImageOps.exif_transpose(original)
+            original.load()
+        if image_format not in KEEP_FORMATS:
+            image_format = 'PNG'
+        # Без явных exif/pnginfo Pillow не переносит метаданные
+        content = encode(original, image_format)
+        storage = recipe.image.storage
+        recipe.image.save(
+            f'{os.path.splitext(os.path.basename(image))[0]}.'
+            f'{image_format.lower()}',
+            content,
+            save=False
+        )
+        make_renditions(recipe, original)
+    except Exception:
+        current.update(image_status=Recipe.IMAGE_FAILED)
+        raise
+    files = [recipe.image.name, *(
+        getattr(recipe, field).name for field in RENDITIONS)]
+    updated = current.update(
+        image_status=Recipe.IMAGE_READY,
+        updated_at=timezone.now(),
+        **dict(zip(('image', *RENDITIONS), files)),
+    )
+    if not updated:
+        # Пока шла обработка, загрузили новое изображение
+        for name in files:
+            storage.delete(name)
+        return
+    storage.delete(image)
+    image_processed.send(sender=Recipe, recipe_id=recipe_id)
@@ -0,0 +1,115 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file, fields):
+    """Строки CSV без заголовка как словари в порядке fields."""
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+def read_json(file, fixture_model=None):
+    """Объекты JSON-массива по одному, не читая файл целиком.
+
+    Поддерживается как список словарей, так и фикстура Django:
+    из неё берутся поля объектов модели fixture_model.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise CommandError('Ожидался JSON-массив')
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError('Некорректный JSON')
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        if 'fields' in obj:
+            if obj.get('model') != fixture_model:
+                continue
+            obj = obj['fields']
+        yield obj
+
+
+class LoadCommand(BaseCommand):
+    """Потоковая загрузка справочника из CSV или JSON.
+
+    Объекты создаются пачками через bulk_create с пропуском
+    конфликтов по уникальным ограничениям, поэтому повторный
+    запуск на тех же данных ничего не дублирует.
+    """
+    model = None
+    fields = ()
+    fixture_model = None
+    default_path = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(self.default_path),
+            help='Путь к файлу .csv или .json'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество объектов в одном INSERT'
+        )
+
+    def read_rows(self, file, path):
+        if path.endswith('.csv'):
+            return read_csv(file, self.fields)
+        if path.endswith('.json'):
+            return read_json(file, self.fixture_model)
+        raise CommandError('Поддерживаются только файлы .csv и .json')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        start = time.monotonic()
+        total = 0
+        try:
+            file = open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(error)
+        with file, transaction.atomic():
+            count_before = self.model.objects.count()
+            rows = self.read_rows(file, path)
+            while True:
+                batch = [
+                    self.model(**{field: row[field] for field in self.fields})
+                    for row in islice(rows, batch_size)
+                ]
+                if not batch:
+                    break
+                self.model.objects.bulk_create(
+                    batch, batch_size=batch_size, ignore_conflicts=True)
+                total += len(batch)
+            created = self.model.objects.count() - count_before
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {total}, добавлено: {created}, '
+            f'{elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} строк/с)'
+        ))
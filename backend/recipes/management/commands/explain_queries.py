@@ -0,0 +1,113 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from recipes.export import shopping_list
+from recipes.models import (
+    Favorite,
+    FeedEntry,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    SimilarRecipe,
+)
+
+# Название -> (функция, строящая запрос, СУБД, для которых он актуален)
+QUERIES = {
+    'Список рецептов': (
+        lambda: Recipe.objects.order_by('-pub_date', '-id')[:6], None),
+    'Список рецептов по курсору': (
+        lambda: Recipe.objects.filter(
+            Q(pub_date__lt=timezone.now())
+            | Q(pub_date=timezone.now(), id__lt=1)
+        ).order_by('-pub_date', '-id')[:7], None),
+    'Популярные рецепты': (
+        lambda: Recipe.objects.order_by('-trending_score')[:6], None),
+    'Изменённые рецепты': (
+        lambda: Recipe.objects.filter(updated_at__gte=timezone.now()),
+        None),
+    'Поиск ингредиента по началу названия': (
+        lambda: Ingredient.objects.filter(name__startswith='абр'),
+        ('postgresql',)),
+    'Поиск ингредиента без учёта регистра': (
+        lambda: Ingredient.objects.filter(name__istartswith='абр'),
+        ('postgresql',)),
+    'Рецепты с ингредиентом': (
+        lambda: IngredientInRecipe.objects.filter(
+            ingredient_id=1).values('recipe_id'), None),
+    'Избранное рецепта': (
+        lambda: Favorite.objects.filter(recipe_id=1).values('pk'), None),
+    'Корзины с рецептом': (
+        lambda: ShoppingCart.objects.filter(recipe_id=1).values('pk'), None),
+    'Лента подписок': (
+        lambda: FeedEntry.objects.filter(user_id=1).order_by(
+            '-pub_date', '-recipe_id')[:7], None),
+    'Похожие рецепты': (
+        lambda: SimilarRecipe.objects.filter(recipe_id=1).order_by(
+            '-score'), None),
+    'Список покупок': (lambda: shopping_list(1), None),
+}
+
+
+def full_scans(plan, tables):
+    """Таблицы, которые план читает целиком, без индекса.
+
+    Полнотекстовый поиск SQLite в плане выглядит как
+    SCAN ... VIRTUAL TABLE INDEX 0:M..., это чтение по индексу FTS5.
+    """
+    if connection.vendor == 'postgresql':
+        found = re.findall(r'Seq Scan on (\w+)', plan)
+    else:
+        found = [
+            match.group(1) for match in re.finditer(
+                r'\bSCAN (\w+)( USING| VIRTUAL TABLE INDEX \d+:\w)?',
+                plan) if not match.group(2)
+        ]
+    return sorted({table for table in found if table in tables})
+
+
+def explain_sql(sql, params=()):
+    """План запроса в текстовом виде: EXPLAIN для PostgreSQL,
+    EXPLAIN QUERY PLAN для SQLite."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Без статистики по большим таблицам планировщик вправе
+            # выбрать полный просмотр, поэтому он запрещается:
+            # Seq Scan останется, только если индекса нет вовсе
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return '\n'.join(row[-1] for row in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = ('Проверка планов основных запросов через EXPLAIN: '
+            'ошибка, если таблица читается целиком')
+
+    def explain(self, queryset):
+        return explain_sql(*queryset.query.sql_with_params())
+
+    def handle(self, *args, **options):
+        tables = set(connection.introspection.table_names())
+        failed = []
+        for title, (build, vendors) in QUERIES.items():
+            if vendors and connection.vendor not in vendors:
+                continue
+            plan = self.explain(build())
+            scans = full_scans(plan, tables)
+            if scans:
+                failed.append(title)
+                self.stdout.write(self.style.ERROR(
+                    f'{title}: полный просмотр {", ".join(scans)}'))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(f'{title}: OK')
+        if failed:
+            raise CommandError(
+                f'Запросы без подходящих индексов: {len(failed)}')
+        self.stdout.write(self.style.SUCCESS('Все запросы используют индексы'))
@@ -0,0 +1,12 @@
+from django.conf import settings
+
+from recipes.models import Ingredient
+from ._loader import LoadCommand
+
+
+class Command(LoadCommand):
+    help = 'Загрузка ингредиентов из CSV или JSON'
+    model = Ingredient
+    fields = ('name', 'measurement_unit')
+    fixture_model = 'recipes.ingredient'
+    default_path = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
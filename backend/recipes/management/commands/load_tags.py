@@ -0,0 +1,12 @@
+from django.conf import settings
+
+from recipes.models import Tag
+from ._loader import LoadCommand
+
+
+class Command(LoadCommand):
+    help = 'Загрузка тэгов из CSV или JSON'
+    model = Tag
+    fields = ('name', 'color', 'slug')
+    fixture_model = 'recipes.tag'
+    default_path = settings.BASE_DIR / 'ingredients.json'
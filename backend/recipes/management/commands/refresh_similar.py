@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similar import refresh
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт похожих рецептов: только изменённых с прошлого '
+            'запуска или всех с --full')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все рецепты'
+        )
+
+    def handle(self, *args, **options):
+        result = refresh(options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {result["recipes"]}'))
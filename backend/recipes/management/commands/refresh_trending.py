@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт оценок популярности: учёт добавлений с прошлого '
+            'запуска или всех с --full')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать оценки по всем добавлениям'
+        )
+
+    def handle(self, *args, **options):
+        result = refresh_trending(options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {result["recipes"]}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.export import remove_expired_exports
+
+
+class Command(BaseCommand):
+    help = 'Удаление устаревших выгрузок списков покупок'
+
+    def handle(self, *args, **options):
+        removed = remove_expired_exports()
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {removed}'))
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_card',
+            field=models.ImageField(blank=True, upload_to='recipes/card/', verbose_name='Изображение для карточки'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, upload_to='recipes/thumbnail/', verbose_name='Миниатюра'),
+        ),
+    ]
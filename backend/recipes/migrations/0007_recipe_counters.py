@@ -0,0 +1,47 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Favorite', 'recipes', 'Recipe', 'recipe', 'favorites_count'),
+    ('recipes', 'ShoppingCart', 'recipes', 'Recipe', 'recipe', 'in_carts_count'),
+    ('recipes', 'Recipe', 'users', 'User', 'author', 'recipes_count'),
+    ('users', 'Subscription', 'users', 'User', 'author', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, sender, target_app, target, foreign_key, field in COUNTERS:
+        sender = apps.get_model(app, sender)
+        counts = sender.objects.filter(
+            **{foreign_key: OuterRef('pk')}
+        ).order_by().values(foreign_key).annotate(
+            total=Count('pk')
+        ).values('total')
+        apps.get_model(target_app, target).objects.update(**{
+            field: Coalesce(Subquery(counts), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_image_status'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
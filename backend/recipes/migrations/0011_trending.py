@@ -0,0 +1,42 @@
+# Generated by Django 3.2.18 on 2026-10-18 19:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+from recipes.search import restore_sqlite_triggers
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite пересоздаёт recipes_recipe при добавлении trending_score
+    # и теряет триггеры полнотекстового поиска из 0008
+    if schema_editor.connection.vendor == 'sqlite':
+        restore_sqlite_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0, verbose_name='Популярность в последнее время'),
+        ),
+        migrations.RunPython(
+            restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.2.18 on 2026-10-18 20:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Регистронезависимые фильтры Django на PostgreSQL сравнивают
+# UPPER("name"::text) LIKE UPPER(%s), индекс строится по тому же выражению
+POSTGRESQL_FORWARD = (
+    'CREATE INDEX ingredient_name_upper_idx ON recipes_ingredient '
+    '(UPPER(name::text) text_pattern_ops)',
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS ingredient_name_upper_idx',
+)
+
+
+def create_name_upper_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRESQL_FORWARD:
+            schema_editor.execute(sql)
+
+
+def drop_name_upper_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRESQL_BACKWARD:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_trending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name'], name='ingredient_name_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='ingredientinrecipe',
+            index=models.Index(fields=['ingredient', 'recipe'], name='ingredient_recipes_idx'),
+        ),
+        migrations.AlterField(
+            model_name='ingredientinrecipe',
+            name='ingredient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='IngredientInRecipe', to='recipes.ingredient'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['updated_at'], name='recipe_updated_at_idx'),
+        ),
+        migrations.RunPython(create_name_upper_index, drop_name_upper_index),
+    ]
@@ -45,6 +45,19 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент',
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['name'],
+                name='ingredient_name_pattern_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -52,6 +65,15 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     '''Модель рецептов'''
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PROCESSING, 'Обрабатывается'),
+        (IMAGE_READY, 'Готово'),
+        (IMAGE_FAILED, 'Ошибка обработки'),
+    ]
+
     name = models.CharField(
         verbose_name='Название рецепта',
         max_length=200
@@ -67,6 +89,22 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipes/'
     )
+    image_card = models.ImageField(
+        verbose_name='Изображение для карточки',
+        upload_to='recipes/card/',
+        blank=True
+    )
+    image_thumbnail = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='recipes/thumbnail/',
+        blank=True
+    )
+    image_status = models.CharField(
+        verbose_name='Статус обработки изображения',
+        max_length=20,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_READY
+    )
     text = models.TextField(
         verbose_name='Описание рецепта'
     )
@@ -91,11 +129,38 @@ class Recipe(models.Model):
         verbose_name='Дата создания рецепта',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения рецепта',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0
+    )
+    trending_score = models.FloatField(
+        verbose_name='Популярность в последнее время',
+        default=0,
+        db_index=True
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_idx',
+            ),
+            models.Index(
+                fields=['updated_at'],
+                name='recipe_updated_at_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -111,7 +176,8 @@ class IngredientInRecipe(models.Model):
     ingredient = models.ForeignKey(
         Ingredient,
         related_name='IngredientInRecipe',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     amount = models.IntegerField(
         'Колличество ингредиентов в данном рецепте',
@@ -131,6 +197,12 @@ class IngredientInRecipe(models.Model):
                 name='unique_ingredients'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='ingredient_recipes_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.ingredient.name} в рецепте {self.recipe.name}'
@@ -150,6 +222,11 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Избранный рецепт'
     )
+    added_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -179,6 +256,11 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепт для корзины'
     )
+    added_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -192,3 +274,89 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe.name} в списке покупок у {self.user.username}'
+
+
+class FeedEntry(models.Model):
+    '''Запись в ленте подписок пользователя'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата создания рецепта'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} в ленте у {self.user_id}'
+
+
+class SimilarRecipe(models.Model):
+    '''Похожий рецепт, рассчитанный заранее'''
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.similar_id} похож на {self.recipe_id}'
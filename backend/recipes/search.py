@@ -0,0 +1,123 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe
+
+# Не больше стольких слов из запроса попадает в поиск
+MAX_TERMS = 8
+TERM_RE = re.compile(r'\w+')
+FTS_TABLE = 'recipes_recipe_fts'
+
+# Триггеры, которые держат FTS5-таблицу в актуальном состоянии.
+# SQLite пересоздаёт таблицу при изменении её схемы в миграциях
+# и теряет триггеры, поэтому после migrate они восстанавливаются.
+SQLITE_TRIGGERS = {
+    'recipes_recipe_fts_insert': """
+    CREATE TRIGGER recipes_recipe_fts_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    'recipes_recipe_fts_delete': """
+    CREATE TRIGGER recipes_recipe_fts_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    'recipes_recipe_fts_update': """
+    CREATE TRIGGER recipes_recipe_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts(recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO recipes_recipe_fts(rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+}
+
+
+def restore_sqlite_triggers(connection):
+    """Создаёт недостающие триггеры и перестраивает FTS-индекс."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = %s", [Recipe._meta.db_table])
+        existing = {name for name, in cursor.fetchall()}
+        missing = [sql for name, sql in SQLITE_TRIGGERS.items()
+                   if name not in existing]
+        for sql in missing:
+            cursor.execute(sql)
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_terms(query):
+    """Слова запроса без операторов полнотекстового синтаксиса."""
+    return TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def postgresql_search(queryset, terms):
+    """Поиск по сохраняемой колонке search_vector с GIN-индексом."""
+    table = Recipe._meta.db_table
+    tsquery = "to_tsquery('russian', %s)"
+    params = (' & '.join(f'{term}:*' for term in terms),)
+    return queryset.annotate(
+        search_match=RawSQL(
+            f'"{table}"."search_vector" @@ {tsquery}',
+            params, output_field=BooleanField()
+        ),
+    ).filter(search_match=True).annotate(
+        search_rank=RawSQL(
+            f'ts_rank("{table}"."search_vector", {tsquery})',
+            params, output_field=FloatField()
+        ),
+    )
+
+
+def sqlite_search(queryset, terms):
+    """Поиск по FTS5-таблице; bm25 меньше у лучших совпадений."""
+    table = Recipe._meta.db_table
+    params = (' '.join(f'"{term}"*' for term in terms),)
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        params
+    )).annotate(search_rank=RawSQL(
+        f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+        params, output_field=FloatField()
+    ))
+
+
+SEARCH_BACKENDS = {
+    'postgresql': postgresql_search,
+    'sqlite': sqlite_search,
+}
+
+
+def search_recipes(queryset, query):
+    """Рецепты, в названии или описании которых есть все слова запроса.
+
+    Слова ищутся по префиксу, название весит больше описания,
+    результат упорядочен по релевантности.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    search = SEARCH_BACKENDS.get(vendor)
+    if search is None:
+        for term in terms:
+            queryset = queryset.filter(name__icontains=term)
+        return queryset
+    return search(queryset, terms).order_by('-search_rank', '-pub_date')
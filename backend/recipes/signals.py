@@ -0,0 +1,100 @@
+from django.db import connections
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from jobs.queue import enqueue
+from users.models import Subscription, User
+from .counters import COUNTERS, change_counter
+from .models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from .search import restore_sqlite_triggers
+
+# Поля автора, которые выводятся в рецептах
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def touch_recipes(**lookup):
+    """Сдвигает updated_at рецептов, чтобы сменились их ETag."""
+    Recipe.objects.filter(**lookup).update(updated_at=timezone.now())
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def ingredient_in_recipe_changed(instance, **kwargs):
+    touch_recipes(pk=instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        relation = 'tags' if isinstance(instance, Tag) else 'ingredients'
+        touch_recipes(**{relation: instance})
+    elif not action.startswith('post_'):
+        return
+    elif not reverse:
+        touch_recipes(pk=instance.pk)
+    elif pk_set:
+        touch_recipes(pk__in=pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(instance, created, **kwargs):
+    if not created:
+        touch_recipes(tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(instance, created, **kwargs):
+    if not created:
+        touch_recipes(ingredients=instance)
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, created, update_fields, **kwargs):
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    touch_recipes(author=instance)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def counted_object_created(sender, instance, created, **kwargs):
+    if created:
+        _, foreign_key, _ = COUNTERS[sender]
+        change_counter(sender, [getattr(instance, foreign_key)], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def counted_object_deleted(sender, instance, **kwargs):
+    _, foreign_key, _ = COUNTERS[sender]
+    change_counter(sender, [getattr(instance, foreign_key)], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(instance, created, **kwargs):
+    if created:
+        enqueue('fan_out_recipe', recipe_id=instance.pk)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name == 'recipes' and connection.vendor == 'sqlite':
+        restore_sqlite_triggers(connection)
@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from jobs.models import JobState
+from jobs.queue import locked_state
+from .models import IngredientInRecipe, Recipe, SimilarRecipe
+
+REFRESH_JOB = 'refresh_similar_recipes'
+# Запас по времени для рецептов, зафиксированных во время прошлого расчёта
+SYNC_OVERLAP = timedelta(minutes=1)
+
+# Вес совпавшего тега относительно совпавшего ингредиента
+TAG_WEIGHT = 0.5
+# Ингредиенты, которые встречаются больше чем в стольких рецептах
+# (соль, вода), не участвуют в расчёте: объём работы растёт как сумма
+# квадратов частот, и с ограничением он линеен по числу рецептов.
+MAX_DOCUMENT_FREQUENCY = 1000
+# Сколько строк матрицы перемножается за один раз
+CHUNK_SIZE = 1000
+WRITE_BATCH_SIZE = 5000
+
+
+def load_pairs(queryset, fields):
+    """Пары id из базы в массив numpy формы (n, 2)."""
+    rows = queryset.order_by().values_list(*fields)
+    pairs = np.fromiter(
+        chain.from_iterable(rows.iterator(chunk_size=10000)),
+        dtype=np.int64
+    )
+    return pairs.reshape(-1, 2)
+
+
+def feature_matrix(rows, features, shape, weight):
+    """Бинарная разреженная матрица с весами признаков по IDF."""
+    _, columns = np.unique(features, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)),
+        shape=(shape, columns.max(initial=-1) + 1)
+    )
+    matrix.data = np.minimum(matrix.data, 1.0)
+    document_frequency = np.bincount(
+        matrix.indices, minlength=matrix.shape[1])
+    idf = weight * (np.log((1 + shape) / (1 + document_frequency)) + 1)
+    return (matrix @ sparse.diags(idf)).tocsr(), document_frequency
+
+
+def build_matrices():
+    """Матрицы «рецепт x ингредиент» и «рецепт x тег».
+
+    Веса - IDF, строки нормированы по обеим матрицам сразу, поэтому
+    сумма скалярных произведений строк даёт косинусную близость.
+    Кандидаты в похожие ищутся только по ингредиентам (разреженная
+    матрица), вклад тегов добавляется для найденных пар (тегов мало,
+    их матрица плотная).
+    Возвращает отсортированные id рецептов и обе матрицы.
+    """
+    ingredients = load_pairs(
+        IngredientInRecipe.objects, ('recipe_id', 'ingredient_id'))
+    tags = load_pairs(Recipe.tags.through.objects, ('recipe_id', 'tag_id'))
+    recipe_ids, rows = np.unique(
+        np.concatenate((ingredients[:, 0], tags[:, 0])), return_inverse=True)
+    count = len(recipe_ids)
+    by_ingredient, document_frequency = feature_matrix(
+        rows[:len(ingredients)], ingredients[:, 1], count, 1.0)
+    by_tag, _ = feature_matrix(
+        rows[len(ingredients):], tags[:, 1], count, TAG_WEIGHT)
+    by_tag = by_tag.toarray().astype(np.float32)
+
+    common = document_frequency > MAX_DOCUMENT_FREQUENCY
+    by_ingredient = (by_ingredient @ sparse.diags(
+        (~common).astype(float))).tocsr()
+    by_ingredient.eliminate_zeros()
+    norms = np.sqrt(
+        np.asarray(by_ingredient.multiply(by_ingredient).sum(axis=1))
+        .ravel() + (by_tag ** 2).sum(axis=1)
+    )
+    norms[norms == 0] = 1
+    by_ingredient = (sparse.diags(1 / norms) @ by_ingredient).tocsr()
+    by_tag /= norms[:, np.newaxis].astype(np.float32)
+    return recipe_ids, by_ingredient, by_tag
+
+
+def neighbours(by_ingredient, by_tag, rows):
+    """Для строк rows - до SIMILAR_RECIPES_K ближайших строк.
+
+    Произведение матриц и вклад тегов считаются для целой пачки строк,
+    лучшие кандидаты каждой строки отбираются argpartition.
+    Возвращает (строка, столбцы, оценки) по убыванию близости.
+    """
+    limit = settings.SIMILAR_RECIPES_K
+    transposed = by_ingredient.T.tocsc()
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        scores = (by_ingredient[chunk] @ transposed).tocsr()
+        positions = np.repeat(
+            np.arange(len(chunk)), np.diff(scores.indptr))
+        scores.data += (
+            by_tag[chunk[positions]] * by_tag[scores.indices]).sum(axis=1)
+        for position, row in enumerate(chunk):
+            begin = scores.indptr[position]
+            end = scores.indptr[position + 1]
+            columns = scores.indices[begin:end]
+            data = scores.data[begin:end]
+            keep = columns != row
+            columns, data = columns[keep], data[keep]
+            if len(data) > limit:
+                best = np.argpartition(-data, limit)[:limit]
+                columns, data = columns[best], data[best]
+            order = np.lexsort((columns, -data))
+            yield row, columns[order], data[order]
+
+
+def touched_rows(by_ingredient, changed_rows):
+    """Строки, у которых есть общие ингредиенты с изменёнными рецептами."""
+    transposed = by_ingredient.T.tocsc()
+    touched = [changed_rows]
+    for start in range(0, len(changed_rows), CHUNK_SIZE):
+        scores = by_ingredient[
+            changed_rows[start:start + CHUNK_SIZE]] @ transposed
+        touched.append(np.unique(scores.tocsr().indices))
+    return np.unique(np.concatenate(touched))
+
+
+def store(recipe_ids, results, stale_ids=()):
+    """Замена рассчитанных списков пачками по WRITE_BATCH_SIZE строк."""
+    stored = 0
+    entries, batch_ids = [], list(stale_ids)
+
+    def flush():
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=batch_ids).delete()
+            SimilarRecipe.objects.bulk_create(entries)
+
+    for row, columns, scores in results:
+        recipe_id = int(recipe_ids[row])
+        batch_ids.append(recipe_id)
+        entries.extend(
+            SimilarRecipe(recipe_id=recipe_id,
+                          similar_id=int(recipe_ids[column]),
+                          score=float(score))
+            for column, score in zip(columns, scores)
+        )
+        stored += 1
+        if len(entries) >= WRITE_BATCH_SIZE:
+            flush()
+            entries, batch_ids = [], []
+    if entries or batch_ids:
+        flush()
+    return stored
+
+
+def refresh_similar_recipes(since=None):
+    """Пересчёт похожих рецептов.
+
+    Без since пересчитываются все рецепты. С since - только изменённые
+    после этого момента, рецепты, в чьих списках они были, и рецепты
+    с общими с ними признаками. Возвращает число пересчитанных рецептов.
+    """
+    recipe_ids, by_ingredient, by_tag = build_matrices()
+    if since is None:
+        rows = np.arange(len(recipe_ids))
+        return store(recipe_ids, neighbours(by_ingredient, by_tag, rows))
+
+    changed = np.fromiter(
+        Recipe.objects.filter(updated_at__gte=since).values_list(
+            'id', flat=True),
+        dtype=np.int64
+    )
+    referrers = np.fromiter(
+        SimilarRecipe.objects.filter(similar_id__in=changed.tolist())
+        .values_list('recipe_id', flat=True).distinct(),
+        dtype=np.int64
+    )
+    present = np.isin(changed, recipe_ids)
+    changed_rows = np.searchsorted(recipe_ids, changed[present])
+    rows = np.union1d(
+        touched_rows(by_ingredient, changed_rows),
+        np.searchsorted(recipe_ids,
+                        referrers[np.isin(referrers, recipe_ids)])
+    )
+    return store(recipe_ids, neighbours(by_ingredient, by_tag, rows),
+                 stale_ids=changed[~present].tolist())
+
+
+def parse_state(state):
+    """Момент начала пересчёта из сохранённого состояния с запасом."""
+    if not state:
+        return None
+    return datetime.fromisoformat(state['started_at']) - SYNC_OVERLAP
+
+
+def last_refresh():
+    """Момент начала последнего успешного пересчёта с запасом."""
+    return parse_state(JobState.objects.filter(
+        kind=REFRESH_JOB).values_list('state', flat=True).first())
+
+
+def refresh(full=False):
+    """Пересчёт изменённых с прошлого запуска рецептов или всех с full.
+
+    Запуски не пересекаются: следующий ждёт окончания текущего
+    и продолжает с его отметки.
+    """
+    with locked_state(REFRESH_JOB) as job_state:
+        started_at = timezone.now()
+        since = None if full else parse_state(job_state.state)
+        recipes = refresh_similar_recipes(since)
+        job_state.state = {'started_at': started_at.isoformat()}
+    return {'incremental': since is not None, 'recipes': recipes}
@@ -0,0 +1,30 @@
+from jobs.queue import task
+from .export import export_shopping_list
+from .feed import fan_out_recipe
+from . import similar, trending
+from .images import process_image
+
+
+@task('process_recipe_image')
+def process_recipe_image(recipe_id, image):
+    process_image(recipe_id, image)
+
+
+@task('export_shopping_list')
+def export_shopping_list_task(user_id, export_format):
+    return export_shopping_list(user_id, export_format)
+
+
+@task('fan_out_recipe')
+def fan_out_recipe_task(recipe_id):
+    fan_out_recipe(recipe_id)
+
+
+@task(similar.REFRESH_JOB)
+def refresh_similar_recipes_task(full=False):
+    return similar.refresh(full)
+
+
+@task(trending.REFRESH_JOB)
+def refresh_trending_task(full=False):
+    return trending.refresh_trending(full)
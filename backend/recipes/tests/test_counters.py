@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from api.tests.base import CatalogTestCase
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+
+class CountersTest(CatalogTestCase):
+
+    def favorites_count(self, recipe):
+        return Recipe.objects.get(pk=recipe.pk).favorites_count
+
+    def test_recipes_and_followers(self):
+        author = self.authors[0]
+        self.assertEqual(
+            User.objects.get(pk=author.pk).recipes_count,
+            self.recipes_per_author)
+        self.add_relations(self.user)
+        self.assertEqual(User.objects.get(pk=author.pk).followers_count, 1)
+        Recipe.objects.get(pk=self.recipes[0].pk).delete()
+        self.assertEqual(
+            User.objects.get(pk=author.pk).recipes_count,
+            self.recipes_per_author - 1)
+
+    def test_favorites_via_api(self):
+        recipe = self.recipes[0]
+        client = self.client_for(self.user)
+        url = f'/api/recipes/{recipe.pk}/favorite/'
+        client.post(url)
+        client.post(url)
+        self.assertEqual(self.favorites_count(recipe), 1)
+        client.delete(url)
+        client.delete(url)
+        self.assertEqual(self.favorites_count(recipe), 0)
+
+    def test_batch_cart(self):
+        ids = [recipe.pk for recipe in self.recipes[:3]]
+        client = self.client_for(self.user)
+        client.post('/api/recipes/shopping_cart/', {'recipes': ids},
+                    format='json')
+        client.post('/api/recipes/shopping_cart/', {'recipes': ids},
+                    format='json')
+        self.assertEqual(
+            list(Recipe.objects.filter(pk__in=ids).values_list(
+                'in_carts_count', flat=True)), [1, 1, 1])
+
+    def test_orm_writes_and_cascades(self):
+        recipe = self.recipes[0]
+        fan = self.create_user('fan')
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        Favorite.objects.create(user=fan, recipe=recipe)
+        ShoppingCart.objects.create(user=fan, recipe=recipe)
+        self.assertEqual(self.favorites_count(recipe), 2)
+        Favorite.objects.filter(user=self.user).delete()
+        self.assertEqual(self.favorites_count(recipe), 1)
+        # Удаление пользователя каскадом уносит его избранное и корзину
+        fan.delete()
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        self.assertEqual(
+            (recipe.favorites_count, recipe.in_carts_count), (0, 0))
+
+    def test_recount(self):
+        self.add_relations(self.user)
+        Recipe.objects.update(favorites_count=7, in_carts_count=7)
+        User.objects.update(recipes_count=7, followers_count=7)
+        call_command('recount', stdout=StringIO())
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        self.assertEqual(
+            (recipe.favorites_count, recipe.in_carts_count), (1, 1))
+        author = User.objects.get(pk=self.authors[0].pk)
+        self.assertEqual(
+            (author.recipes_count, author.followers_count),
+            (self.recipes_per_author, 1))
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).recipes_count, 0)
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.export import EXPORT_TTL, export_shopping_list
+from recipes.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+)
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_EAGER=True)
+class ExportTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='x')
+        recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Описание',
+            cooking_time=5, image='recipes/test.png')
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        IngredientInRecipe.objects.create(
+            recipe=recipe, ingredient=salt, amount=5)
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def age(self, name, seconds):
+        stamp = time.time() - seconds
+        os.utime(default_storage.path(name), (stamp, stamp))
+
+    def test_reused_export_is_renewed(self):
+        name = export_shopping_list(self.user.pk, 'csv')['file']
+        self.age(name, EXPORT_TTL - 60)
+        self.assertEqual(
+            export_shopping_list(self.user.pk, 'csv')['file'], name)
+        call_command('remove_expired_exports', stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+
+    def test_expired_export_is_removed(self):
+        name = export_shopping_list(self.user.pk, 'txt')['file']
+        self.age(name, EXPORT_TTL + 60)
+        call_command('remove_expired_exports', stdout=StringIO())
+        self.assertFalse(default_storage.exists(name))
+        name = export_shopping_list(self.user.pk, 'txt')['file']
+        self.assertTrue(default_storage.exists(name))
+
+    def test_download_requires_authentication(self):
+        for export_format in ('pdf', 'csv', 'txt', 'json'):
+            with self.subTest(export_format=export_format):
+                response = APIClient().get(
+                    '/api/recipes/download_shopping_cart/'
+                    f'?format={export_format}')
+                self.assertEqual(response.status_code, 401)
+
+    def test_export_job(self):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=self.user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                '/api/recipes/download_shopping_cart/jobs/',
+                {'format': 'csv'})
+        self.assertEqual(response.status_code, 202)
+        response = client.get(
+            f'/api/recipes/download_shopping_cart/jobs/{response.data["id"]}/')
+        self.assertEqual(response.data['status'], 'done')
+        self.assertTrue(response.data['url'].endswith('.csv'))
+
+
+class ShoppingListFormatsTest(TestCase):
+    """Текстовые форматы списка покупок с суммированием в базе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='x')
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        sugar = Ingredient.objects.create(
+            name='сахар', measurement_unit='г')
+        for amounts in ({salt: 5, sugar: 10}, {salt: 3}):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {len(amounts)}',
+                text='Описание', cooking_time=5, image='recipes/test.png')
+            for ingredient, amount in amounts.items():
+                IngredientInRecipe.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=amount)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def download(self, export_format, user=None):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user or self.user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = client.get(
+            f'/api/recipes/download_shopping_cart/?format={export_format}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode(), response
+
+    def test_csv(self):
+        content, response = self.download('csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertEqual(content.splitlines(), [
+            'name,measurement_unit,amount', 'сахар,г,10', 'соль,г,8'])
+
+    def test_txt(self):
+        content, _ = self.download('txt')
+        self.assertEqual(content.splitlines(), [
+            'Cписок покупок:', 'Сахар --> 10 г', 'Соль --> 8 г'])
+
+    def test_json(self):
+        content, _ = self.download('json')
+        self.assertEqual(json.loads(content), [
+            {'name': 'сахар', 'measurement_unit': 'г', 'amount': 10},
+            {'name': 'соль', 'measurement_unit': 'г', 'amount': 8},
+        ])
+
+    def test_empty_cart(self):
+        user = User.objects.create_user(
+            username='guest', email='guest@example.com', password='x')
+        content, _ = self.download('json', user)
+        self.assertEqual(json.loads(content), [])
@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes import images
+from recipes.models import Recipe
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png():
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), 'red').save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ProcessImageTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='x')
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=5,
+            image_status=Recipe.IMAGE_PROCESSING)
+        self.recipe.image.save('upload.png', png())
+        self.uploaded = self.recipe.image.name
+
+    def test_processed(self):
+        images.process_image(self.recipe.pk, self.uploaded)
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_READY)
+        self.assertFalse(default_storage.exists(self.uploaded))
+        for field, size in images.RENDITIONS.items():
+            with getattr(recipe, field).open('rb') as file:
+                rendition = Image.open(file)
+                self.assertEqual(rendition.format, 'WEBP')
+                self.assertLessEqual(rendition.size, size)
+
+    def test_newer_upload_is_kept(self):
+        newer = default_storage.save('recipes/newer.png', png())
+
+        def upload_during_processing(recipe, image):
+            Recipe.objects.filter(pk=recipe.pk).update(image=newer)
+            make_renditions(recipe, image)
+
+        make_renditions = images.make_renditions
+        with mock.patch.object(images, 'make_renditions',
+                               upload_during_processing):
+            images.process_image(self.recipe.pk, self.uploaded)
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.image.name, newer)
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_PROCESSING)
+        self.assertEqual(recipe.image_card.name, '')
+        # Задача для нового изображения найдёт его и обработает
+        images.process_image(self.recipe.pk, newer)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).image_status,
+                         Recipe.IMAGE_READY)
+
+    def test_failure_keeps_newer_upload_status(self):
+        def fail_after_new_upload(recipe, image):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image='recipes/newer.png')
+            raise OSError
+
+        with mock.patch.object(images, 'make_renditions',
+                               fail_after_new_upload):
+            with self.assertRaises(OSError):
+                images.process_image(self.recipe.pk, self.uploaded)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).image_status,
+                         Recipe.IMAGE_PROCESSING)
+
+    def test_failure(self):
+        with mock.patch.object(images, 'make_renditions',
+                               mock.Mock(side_effect=OSError)):
+            with self.assertRaises(OSError):
+                images.process_image(self.recipe.pk, self.uploaded)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).image_status,
+                         Recipe.IMAGE_FAILED)
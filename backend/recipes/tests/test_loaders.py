@@ -0,0 +1,85 @@
+import json
+import os
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from recipes.management.commands._loader import read_json
+from recipes.models import Ingredient, Tag
+
+DATA_DIR = settings.BASE_DIR.parent / 'data'
+
+
+class ReadJsonTest(SimpleTestCase):
+
+    def test_objects_split_between_chunks(self):
+        objects = [{'name': f'ингредиент {i}', 'measurement_unit': 'г'}
+                   for i in range(50)]
+        with mock.patch(
+                'recipes.management.commands._loader.CHUNK_SIZE', 7):
+            self.assertEqual(
+                list(read_json(StringIO(json.dumps(objects)))), objects)
+
+    def test_fixture_objects_of_one_model(self):
+        fixture = [
+            {'model': 'recipes.tag', 'pk': 1, 'fields': {'slug': 'a'}},
+            {'model': 'recipes.ingredient', 'pk': 1, 'fields': {'x': 1}},
+        ]
+        self.assertEqual(
+            list(read_json(StringIO(json.dumps(fixture)), 'recipes.tag')),
+            [{'slug': 'a'}])
+
+    def test_broken_json(self):
+        for content in ('{"name": 1}', '[{"name": 1}'):
+            with self.subTest(content=content):
+                with self.assertRaises(CommandError):
+                    list(read_json(StringIO(content)))
+
+
+class LoadCommandTest(TestCase):
+
+    def data_file(self, content, suffix):
+        file = NamedTemporaryFile(
+            'w', suffix=suffix, encoding='utf-8', delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write(content)
+        return file.name
+
+    def load(self, command, path):
+        call_command(command, str(path), stdout=StringIO())
+
+    def test_bundled_ingredients(self):
+        with open(DATA_DIR / 'ingredients.csv', encoding='utf-8') as file:
+            expected = sum(1 for line in file if line.strip())
+        for name in ('ingredients.csv', 'ingredients.json'):
+            with self.subTest(name=name):
+                self.load('load_ingredients', DATA_DIR / name)
+                self.assertEqual(Ingredient.objects.count(), expected)
+
+    def test_repeated_load_adds_nothing(self):
+        path = self.data_file('соль,г\nсоль,кг\nсахар,г\n', '.csv')
+        self.load('load_ingredients', path)
+        self.load('load_ingredients', path)
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+    def test_tags(self):
+        path = self.data_file(json.dumps([
+            {'name': 'Завтрак', 'color': '#E26C2D', 'slug': 'breakfast'},
+            {'name': 'Обед', 'color': '#49B64E', 'slug': 'lunch'},
+        ]), '.json')
+        self.load('load_tags', path)
+        self.assertEqual(
+            set(Tag.objects.values_list('slug', flat=True)),
+            {'breakfast', 'lunch'})
+
+    def test_unsupported_file(self):
+        with self.assertRaises(CommandError):
+            self.load('load_ingredients', self.data_file('', '.xml'))
+        with self.assertRaises(CommandError):
+            self.load('load_ingredients', DATA_DIR / 'missing.csv')
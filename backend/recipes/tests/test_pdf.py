@@ -0,0 +1,50 @@
+import re
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from reportlab.lib.pagesizes import A4
+
+from recipes import generate_pdf as pdf
+from recipes.generate_pdf import generate_pdf, render_pdf
+
+# Строки идут под заголовком, пока не дойдут до нижнего поля
+FIRST_ROW = pdf.MARGIN_TOP + 2 * pdf.LINE_HEIGHT
+ROWS_PER_PAGE = int(
+    (A4[1] - pdf.MARGIN_BOTTOM - FIRST_ROW) // pdf.LINE_HEIGHT) + 1
+
+
+def shopping_rows(count):
+    return [
+        {'ingredient__name': f'ингредиент {i}', 'quantity': i,
+         'ingredient__measurement_unit': 'г'}
+        for i in range(count)
+    ]
+
+
+def page_count(data):
+    return len(re.findall(rb'/Type /Page\b(?!s)', data))
+
+
+class RenderPdfTest(SimpleTestCase):
+
+    def test_long_list_takes_several_pages(self):
+        for count, pages in ((0, 1), (ROWS_PER_PAGE, 1),
+                             (ROWS_PER_PAGE + 1, 2),
+                             (3 * ROWS_PER_PAGE + 1, 4)):
+            with self.subTest(count=count):
+                self.assertEqual(
+                    page_count(render_pdf(shopping_rows(count))), pages)
+
+    def test_same_list_is_rendered_once(self):
+        cache.clear()
+        rows = shopping_rows(5)
+        with mock.patch('recipes.generate_pdf.render_pdf',
+                        wraps=render_pdf) as render:
+            first = generate_pdf(rows)
+            second = generate_pdf(list(rows))
+            generate_pdf(shopping_rows(6))
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['Content-Type'].split(';')[0],
+                         'application/pdf')
@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.tests.base import CatalogTestCase
+from recipes.management.commands.explain_queries import (
+    explain_sql,
+    full_scans,
+)
+from recipes.models import (
+    Favorite,
+    FeedEntry,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    SimilarRecipe,
+)
+from users.models import User
+
+# Таблицы, которые в тесте заполняются большим числом строк;
+# полный просмотр маленьких справочников (тегов, пользователей) допустим
+LARGE_TABLES = {
+    Recipe._meta.db_table,
+    Recipe.tags.through._meta.db_table,
+    IngredientInRecipe._meta.db_table,
+    Favorite._meta.db_table,
+    ShoppingCart._meta.db_table,
+    FeedEntry._meta.db_table,
+    SimilarRecipe._meta.db_table,
+}
+
+
+class QueryPlanTest(CatalogTestCase):
+    """Планы SQL, который реально выполняют основные эндпоинты.
+
+    Запросы перехватываются во время обращения к API, для каждого
+    строится EXPLAIN, и тест падает, если большая таблица читается
+    целиком. Таблицы заполняются заранее и анализируются через
+    ANALYZE, чтобы планировщик исходил из их настоящего размера.
+    """
+    crowd_size = 20
+    recipes_per_member = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        crowd = User.objects.bulk_create(
+            User(username=f'crowd{i}', email=f'crowd{i}@example.com')
+            for i in range(cls.crowd_size)
+        )
+        crowd = list(User.objects.filter(
+            username__in=[member.username for member in crowd]))
+        now = timezone.now()
+        Recipe.objects.bulk_create(
+            Recipe(author=member, name=f'Рецепт {member.pk}-{i}',
+                   text='Описание', cooking_time=10,
+                   image='recipes/test.png',
+                   pub_date=now - timedelta(minutes=i))
+            for member in crowd
+            for i in range(cls.recipes_per_member)
+        )
+        recipe_ids = list(Recipe.objects.filter(
+            author__in=crowd).values_list('id', flat=True))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe_id, tag=cls.tags[0])
+            for recipe_id in recipe_ids
+        )
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe_id=recipe_id, ingredient=ingredient,
+                               amount=10)
+            for recipe_id in recipe_ids
+            for ingredient in cls.ingredients[:3]
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=member, recipe_id=recipe_id)
+                for member in crowd
+                for recipe_id in recipe_ids[::cls.crowd_size]
+            )
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user=member, recipe_id=recipe_id, author=crowd[0],
+                      pub_date=now)
+            for member in crowd
+            for recipe_id in recipe_ids[:cls.recipes_per_member]
+        )
+        SimilarRecipe.objects.bulk_create(
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                          score=1.0)
+            for recipe_id, similar_id in zip(recipe_ids, recipe_ids[1:])
+        )
+        cls.add_relations(cls.user)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assert_uses_indexes(self, url):
+        client = self.client_for(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain_sql(sql)
+            self.assertEqual(
+                full_scans(plan, LARGE_TABLES), [],
+                f'{url}\n{sql}\n{plan}')
+
+    def test_recipe_list(self):
+        for query in ('', '?limit=12', '?is_favorited=1',
+                      '?is_in_shopping_cart=1', '?tags=tag1',
+                      f'?author={self.authors[0].pk}', '?ordering=trending',
+                      '?search=рецепт'):
+            with self.subTest(query=query):
+                self.assert_uses_indexes(f'/api/recipes/{query}')
+
+    def test_recipe_list_next_page(self):
+        response = self.client.get('/api/recipes/')
+        self.assert_uses_indexes(response.data['next'])
+
+    def test_recipe_detail(self):
+        self.assert_uses_indexes(f'/api/recipes/{self.recipes[0].pk}/')
+
+    def test_similar(self):
+        self.assert_uses_indexes(
+            f'/api/recipes/{self.recipes[0].pk}/similar/')
+
+    def test_feed(self):
+        self.assert_uses_indexes('/api/recipes/feed/')
+
+    def test_subscriptions(self):
+        self.assert_uses_indexes('/api/users/subscriptions/')
+
+    def test_shopping_list(self):
+        self.assert_uses_indexes(
+            '/api/recipes/download_shopping_cart/?format=csv')
+
+    def test_ingredient_search(self):
+        self.assert_uses_indexes('/api/ingredients/?name=аб')
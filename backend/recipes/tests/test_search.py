@@ -0,0 +1,72 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from recipes.models import Recipe
+from recipes.search import SQLITE_TRIGGERS, search_recipes
+from users.models import User
+
+
+def sqlite_triggers():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'recipes_recipe'")
+        return {name for name, in cursor.fetchall()}
+
+
+class SearchTest(TransactionTestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x')
+
+    def create_recipe(self, name, text='Описание'):
+        return Recipe.objects.create(
+            author=self.author, name=name, text=text, cooking_time=5,
+            image='recipes/test.png')
+
+    def search(self, query):
+        return list(search_recipes(
+            Recipe.objects.all(), query).values_list('name', flat=True))
+
+    def test_index_follows_changes(self):
+        soup = self.create_recipe('Борщ', 'Свёкла и капуста')
+        self.create_recipe('Блины')
+        self.assertEqual(self.search('капуста'), ['Борщ'])
+        soup.name = 'Щи'
+        soup.save()
+        self.assertEqual(self.search('щи'), ['Щи'])
+        self.assertEqual(self.search('борщ'), [])
+        soup.delete()
+        self.assertEqual(self.search('капуста'), [])
+
+    def test_name_ranks_above_text(self):
+        self.create_recipe('Суп дня', 'Куриный бульон')
+        self.create_recipe('Куриный суп', 'Лапша')
+        self.create_recipe('Салат', 'Огурцы')
+        self.assertEqual(self.search('курин'), ['Куриный суп', 'Суп дня'])
+        self.assertEqual(self.search('суп лапш'), ['Куриный суп'])
+
+    def test_query_syntax_is_ignored(self):
+        self.create_recipe('Борщ')
+        for query in ('"борщ', 'борщ*', '-борщ', '(борщ)'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), ['Борщ'])
+        # Операторы становятся обычными словами, а нужны все слова
+        self.assertEqual(self.search('борщ OR щи'), [])
+        self.assertEqual(self.search('!!! ***'), [])
+
+    def test_trending_migration_keeps_sqlite_triggers(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Триггеры FTS5 есть только в SQLite')
+        executor = MigrationExecutor(connection)
+        latest = executor.loader.graph.leaf_nodes('recipes')
+        executor.migrate([('recipes', '0010_similarrecipe')])
+        try:
+            executor.loader.build_graph()
+            executor.migrate([('recipes', '0011_trending')])
+            self.assertEqual(sqlite_triggers(), set(SQLITE_TRIGGERS))
+        finally:
+            executor.loader.build_graph()
+            executor.migrate(latest)
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.utils import timezone
+
+from api.tests.base import CatalogTestCase
+from jobs.models import Job
+from recipes import similar
+from recipes.models import IngredientInRecipe, SimilarRecipe
+from recipes.similar import refresh_similar_recipes
+from recipes.tasks import refresh_similar_recipes_task
+
+
+class SimilarRecipesTest(CatalogTestCase):
+
+    def similar(self, recipe):
+        return list(SimilarRecipe.objects.filter(
+            recipe=recipe).order_by('-score').values_list(
+                'similar_id', 'score'))
+
+    def twins(self, recipe):
+        """Рецепты других авторов с тем же номером: те же ингредиенты
+        и теги."""
+        position = self.recipes.index(recipe) % self.recipes_per_author
+        return {
+            other.pk for index, other in enumerate(self.recipes)
+            if index % self.recipes_per_author == position
+            and other.pk != recipe.pk
+        }
+
+    def test_full_refresh(self):
+        self.assertEqual(refresh_similar_recipes(), len(self.recipes))
+        for recipe in self.recipes:
+            entries = self.similar(recipe)
+            ids = [pk for pk, _ in entries]
+            self.assertNotIn(recipe.pk, ids)
+            self.assertEqual(set(ids[:2]), self.twins(recipe))
+            self.assertAlmostEqual(entries[0][1], 1.0, places=5)
+            scores = [score for _, score in entries]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+        # Без общих ингредиентов рецепты не похожи, даже с общим тегом
+        first, last = self.recipes[0], self.recipes[3]
+        self.assertNotIn(last.pk, [pk for pk, _ in self.similar(first)])
+
+    def test_limit(self):
+        with self.settings(SIMILAR_RECIPES_K=2):
+            refresh_similar_recipes()
+        for recipe in self.recipes:
+            self.assertEqual(len(self.similar(recipe)), 2)
+
+    def test_common_ingredients_are_skipped(self):
+        with mock.patch('recipes.similar.MAX_DOCUMENT_FREQUENCY', 0):
+            refresh_similar_recipes()
+        self.assertFalse(SimilarRecipe.objects.exists())
+
+    def test_incremental_refresh(self):
+        refresh_similar_recipes()
+        since = timezone.now()
+        recipe = self.recipes[0]
+        IngredientInRecipe.objects.filter(recipe=recipe).delete()
+        for ingredient in self.ingredients[3:]:
+            IngredientInRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=10)
+        recipe.save()
+        refresh_similar_recipes(since)
+        self.assertIn(self.recipes[3].pk,
+                      [pk for pk, _ in self.similar(recipe)])
+        # Бывшие двойники пересчитаны: рецепт им больше не идентичен
+        for twin in self.twins(recipe):
+            self.assertNotIn(recipe.pk, [
+                pk for pk, score in self.similar(twin) if score > 0.99])
+
+    def test_task_keeps_watermark(self):
+        self.assertFalse(refresh_similar_recipes_task()['incremental'])
+        Job.objects.all().delete()
+        self.assertIsNotNone(similar.last_refresh())
+        self.assertTrue(refresh_similar_recipes_task()['incremental'])
+
+    def test_api(self):
+        refresh_similar_recipes()
+        recipe = self.recipes[0]
+        response = self.client.get(f'/api/recipes/{recipe.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data],
+                         [pk for pk, _ in self.similar(recipe)])
+        response = self.client.get('/api/recipes/1000000/similar/')
+        self.assertEqual(response.status_code, 404)
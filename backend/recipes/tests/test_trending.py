@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+from itertools import count
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.tests.base import CatalogTestCase
+from jobs.models import Job
+from recipes import trending
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+class TrendingTest(CatalogTestCase):
+    fans = count()
+
+    def add(self, model, recipe, age, user=None):
+        """Добавление в избранное или корзину age назад."""
+        user = user or self.create_user(f'fan{next(self.fans)}')
+        entry = model.objects.create(user=user, recipe=recipe)
+        model.objects.filter(pk=entry.pk).update(
+            added_at=timezone.now() - age)
+
+    def refresh(self, *args, later=timedelta(0)):
+        """Пересчёт так, будто он запущен через later."""
+        now = timezone.now() + later
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            call_command('refresh_trending', *args, stdout=StringIO())
+
+    def scores(self):
+        return dict(Recipe.objects.values_list('pk', 'trending_score'))
+
+    def assert_ratio(self, scores, first, second, ratio):
+        self.assertAlmostEqual(
+            scores[first.pk] / scores[second.pk], ratio, places=3)
+
+    def test_decay_and_weights(self):
+        fresh, old, in_cart, recent = self.recipes[:4]
+        self.add(Favorite, fresh, timedelta(minutes=5))
+        self.add(Favorite, old, timedelta(days=1, minutes=5))
+        self.add(ShoppingCart, in_cart, timedelta(minutes=5))
+        # Ещё не устоявшиеся добавления ждут следующего запуска
+        self.add(Favorite, recent, timedelta(seconds=5))
+        self.refresh()
+        scores = self.scores()
+        self.assert_ratio(scores, fresh, old, 2)
+        self.assert_ratio(scores, in_cart, fresh, 2)
+        self.assertEqual(scores[recent.pk], 0)
+        response = self.client.get('/api/recipes/?ordering=trending')
+        self.assertEqual(
+            [item['id'] for item in response.data['results'][:3]],
+            [in_cart.pk, fresh.pk, old.pk])
+
+    def test_incremental_matches_full(self):
+        first, second, third = self.recipes[:3]
+        self.add(Favorite, first, timedelta(hours=5))
+        self.add(ShoppingCart, second, timedelta(hours=30))
+        self.refresh()
+        # Добавления после прошлого пересчёта учитываются следующим
+        self.add(Favorite, second, timedelta(0))
+        self.add(ShoppingCart, third, timedelta(0))
+        for rescale, hours in ((False, 2), (True, 3)):
+            later = timedelta(hours=hours)
+            with self.subTest(rescale=rescale):
+                # Свежее добавление между пересчётами
+                self.add(Favorite, first, timedelta(minutes=30) - later)
+                exponent = 0 if rescale else 50
+                with mock.patch(
+                        'recipes.trending.MAX_EXPONENT', exponent):
+                    self.refresh(later=later)
+                incremental = self.scores()
+                self.refresh('--full', later=later)
+                full = self.scores()
+                for recipe in (first, second):
+                    self.assertAlmostEqual(
+                        incremental[recipe.pk] / incremental[third.pk],
+                        full[recipe.pk] / full[third.pk], places=6)
+
+    def test_command_does_not_use_queue(self):
+        self.refresh()
+        self.assertFalse(
+            Job.objects.filter(kind=trending.REFRESH_JOB).exists())
+        landmark, until = trending.last_refresh()
+        self.assertEqual(landmark, until)
@@ -0,0 +1,104 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import Case, F, FloatField, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from jobs.models import JobState
+from jobs.queue import locked_state
+from .models import Favorite, Recipe, ShoppingCart
+
+REFRESH_JOB = 'refresh_trending'
+# За это время вклад добавления в избранное или корзину падает вдвое
+HALF_LIFE = timedelta(days=1)
+DECAY_RATE = math.log(2) / HALF_LIFE.total_seconds()
+WEIGHTS = {
+    Favorite: 1.0,
+    ShoppingCart: 2.0,
+}
+# Добавления моложе этого не учитываются до следующего запуска:
+# их транзакции могут быть ещё не зафиксированы
+SETTLE = timedelta(minutes=1)
+# При таком показателе экспоненты точка отсчёта переносится вперёд
+MAX_EXPONENT = 50
+UPDATE_BATCH_SIZE = 500
+
+trending_refreshed = Signal()
+
+
+def parse_state(state):
+    """Точка отсчёта и граница пересчёта из сохранённого состояния."""
+    if not state:
+        return None
+    return (datetime.fromisoformat(state['landmark']),
+            datetime.fromisoformat(state['until']))
+
+
+def last_refresh():
+    """Точка отсчёта и граница последнего успешного пересчёта."""
+    return parse_state(JobState.objects.filter(
+        kind=REFRESH_JOB).values_list('state', flat=True).first())
+
+
+def contributions(since, until, landmark):
+    """Вклады добавлений из [since, until) по рецептам.
+
+    Вклад считается как вес * exp(k * (t - landmark)): отношение таких
+    сумм у рецептов совпадает с отношением затухающих оценок в любой
+    момент времени, поэтому старые оценки не нужно пересчитывать.
+    """
+    scores = defaultdict(float)
+    for model, weight in WEIGHTS.items():
+        rows = model.objects.filter(added_at__lt=until)
+        if since is not None:
+            rows = rows.filter(added_at__gte=since)
+        for recipe_id, added_at in rows.values_list(
+                'recipe_id', 'added_at').iterator(chunk_size=10000):
+            scores[recipe_id] += weight * math.exp(
+                DECAY_RATE * (added_at - landmark).total_seconds())
+    return scores
+
+
+def add_scores(scores):
+    """Прибавляет вклады к trending_score пачками UPDATE ... CASE."""
+    recipe_ids = list(scores)
+    for start in range(0, len(recipe_ids), UPDATE_BATCH_SIZE):
+        batch = recipe_ids[start:start + UPDATE_BATCH_SIZE]
+        Recipe.objects.filter(pk__in=batch).update(
+            trending_score=F('trending_score') + Case(
+                *(When(pk=pk, then=Value(scores[pk])) for pk in batch),
+                output_field=FloatField()
+            )
+        )
+
+
+def refresh_trending(full=False):
+    """Учёт добавлений в избранное и корзины с прошлого пересчёта.
+
+    С full или при первом запуске оценки считаются заново по всем
+    добавлениям. Раз в MAX_EXPONENT / k секунд оценки всех рецептов
+    один раз домножаются на затухание, чтобы не переполнить float.
+    Пересчёты не пересекаются: иначе оба учли бы одни и те же
+    добавления дважды.
+    """
+    with locked_state(REFRESH_JOB) as job_state:
+        state = None if full else parse_state(job_state.state)
+        until = timezone.now() - SETTLE
+        if state is None:
+            landmark, since = until, None
+            Recipe.objects.exclude(trending_score=0).update(trending_score=0)
+        else:
+            landmark, since = state
+            exponent = DECAY_RATE * (until - landmark).total_seconds()
+            if exponent > MAX_EXPONENT:
+                Recipe.objects.exclude(trending_score=0).update(
+                    trending_score=F('trending_score') * math.exp(-exponent))
+                landmark = until
+        scores = contributions(since, until, landmark)
+        add_scores(scores)
+        state = {'landmark': landmark.isoformat(), 'until': until.isoformat()}
+        job_state.state = state
+    trending_refreshed.send(sender=Recipe)
+    return {**state, 'recipes': len(scores)}
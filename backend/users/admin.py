@@ -12,9 +12,11 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
         'role',
+        'recipes_count',
+        'followers_count',
     )
     list_filter = ('username', 'email')
 
 
-admin.site.register(User)
+admin.site.register(User, UserAdmin)
 admin.site.register(Subscription)
@@ -48,6 +48,14 @@ class User(AbstractUser):
         default=USER,
         blank=True
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0
+    )
 
     @property
     def is_admin(self):